@@ -25,7 +25,7 @@ DEFAULT_CONFIG = {
     },
     "storage": {
         "base_dir": "./data/binance_orderbook",  # Относительный путь
-        "compression": "gzip",
+        "compression": "zstd",
         "rotation_hours": 24,
         "backup_enabled": True
     },
@@ -2,6 +2,12 @@
 Модуль для финансовых фичей и ML pipeline
 """
 
-from .feature_pipeline import FeaturePipeline, MarketFeatures, FeatureStorage
+from .feature_pipeline import (
+    FeaturePipeline, MarketFeatures, FeatureStorage,
+    MARKET_DATA_DTYPE, FEATURES_DTYPE, features_to_array
+)
 
-__all__ = ['FeaturePipeline', 'MarketFeatures', 'FeatureStorage']
\ No newline at end of file
+__all__ = [
+    'FeaturePipeline', 'MarketFeatures', 'FeatureStorage',
+    'MARKET_DATA_DTYPE', 'FEATURES_DTYPE', 'features_to_array'
+]
\ No newline at end of file
@@ -12,6 +12,7 @@ Feature Pipeline для расчета финансовых индикаторо
 """
 
 import asyncio
+import asyncpg
 import numpy as np
 import pandas as pd
 import logging
@@ -20,6 +21,89 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 import json
 
+# Схема строки market_data_1s для передачи batch в виде структурированного массива
+# (ts_bucket хранится как object, чтобы сохранить tz-aware datetime; NULL -> NaN)
+MARKET_DATA_DTYPE = np.dtype([
+    ('ts_bucket', 'O'),
+    ('symbol', 'U20'),
+    ('bid_close', 'f8'),
+    ('ask_close', 'f8'),
+    ('spread_avg', 'f8'),
+    ('microprice_avg', 'f8'),
+    ('bt_ticks', 'f8'),
+    ('price_close', 'f8'),
+    ('volume', 'f8'),
+    ('trade_count', 'f8'),
+    ('vwap', 'f8'),
+    ('buy_ratio', 'f8'),
+    ('depth_updates', 'f8'),
+    ('bid_qty_close', 'f8'),
+    ('ask_qty_close', 'f8'),
+])
+
+# Numba опционален: без него ценовые фичи считаются векторно через NumPy
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _price_features_numpy(bid, ask, bid_qty, ask_qty):
+    """
+    Ценовые фичи без состояния по столбцам batch (реализация на NumPy).
+    
+    Returns:
+        Массив (n, 6): microprice, mid_price, spread_abs, spread_rel, i1, return_1s (NaN, если нет)
+    """
+    n = bid.shape[0]
+    out = np.empty((n, 6))
+    mid = (bid + ask) / 2
+    total = bid_qty + ask_qty
+    spread = ask - bid
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[:, 0] = np.where(total == 0, mid, (bid * ask_qty + ask * bid_qty) / total)
+        out[:, 1] = mid
+        out[:, 2] = spread
+        out[:, 3] = np.where(mid > 0, spread / mid, 0.0)
+        out[:, 4] = np.where(total == 0, 0.0, (bid_qty - ask_qty) / total)
+        if n:
+            out[0, 5] = np.nan
+            prev_mid = mid[:-1]
+            out[1:, 5] = np.where(prev_mid > 0, np.log(mid[1:] / prev_mid), np.nan)
+    return out
+
+
+def _price_features_kernel(bid, ask, bid_qty, ask_qty):
+    """Ценовые фичи без состояния: один проход по строкам (компилируется Numba)"""
+    n = bid.shape[0]
+    out = np.empty((n, 6))
+    for i in range(n):
+        b = bid[i]
+        a = ask[i]
+        bq = bid_qty[i]
+        aq = ask_qty[i]
+        mid = (b + a) / 2
+        total = bq + aq
+        if total == 0:
+            out[i, 0] = (b + a) / 2
+            out[i, 4] = 0.0
+        else:
+            out[i, 0] = (b * aq + a * bq) / total
+            out[i, 4] = (bq - aq) / total
+        out[i, 1] = mid
+        out[i, 2] = a - b
+        out[i, 3] = (a - b) / mid if mid > 0 else 0.0
+        if i == 0:
+            out[i, 5] = np.nan
+        else:
+            prev_mid = (bid[i - 1] + ask[i - 1]) / 2
+            out[i, 5] = np.log(mid / prev_mid) if prev_mid > 0 else np.nan
+    return out
+
+
+# fastmath не используется: NaN служит маркером отсутствующего return_1s
+_price_features = njit(cache=True)(_price_features_kernel) if njit is not None else _price_features_numpy
+
 @dataclass
 class MarketFeatures:
     """Структура для хранения вычисленных фичей"""
@@ -65,6 +149,42 @@ class MarketFeatures:
             'return_1s': self.return_1s
         }
 
+# Схема экспортируемых фичей: поля и порядок как в MarketFeatures.to_dict()
+# (timestamp в ISO-формате, отсутствующие значения -> NaN)
+FEATURES_DTYPE = np.dtype([
+    ('timestamp', 'O'),
+    ('symbol', 'U20'),
+    ('microprice', 'f8'),
+    ('mid_price', 'f8'),
+    ('spread_abs', 'f8'),
+    ('spread_rel', 'f8'),
+    ('i1', 'f8'),
+    ('i10', 'f8'),
+    ('ofi', 'f8'),
+    ('volume_imbalance', 'f8'),
+    ('buy_volume_ratio', 'f8'),
+    ('vpin', 'f8'),
+    ('price_volatility', 'f8'),
+    ('return_1s', 'f8'),
+])
+
+
+def features_to_array(features_list: List[MarketFeatures]) -> np.ndarray:
+    """Упаковывает список MarketFeatures в структурированный массив FEATURES_DTYPE"""
+    return np.array(
+        [
+            (
+                f.timestamp.isoformat(), f.symbol,
+                f.microprice, f.mid_price, f.spread_abs, f.spread_rel,
+                f.i1, f.i10, f.ofi,
+                f.volume_imbalance, f.buy_volume_ratio, f.vpin,
+                f.price_volatility, f.return_1s
+            )
+            for f in features_list
+        ],
+        dtype=FEATURES_DTYPE
+    )
+
 class FeaturePipeline:
     """Pipeline для расчета финансовых фичей из market data"""
     
@@ -225,6 +345,36 @@ class FeaturePipeline:
             
         return float(np.std(returns))
     
+    def _calculate_volume_features(self, symbol: str,
+                                   trade_data: Optional[Dict]) -> Tuple[float, float, Optional[float]]:
+        """
+        Рассчитывает volume_imbalance, buy_volume_ratio и VPIN (обновляет буфер объемов)
+        """
+        volume_imbalance = 0.0
+        buy_volume_ratio = 0.5
+        vpin = None
+        
+        if trade_data:
+            buy_volume = float(trade_data.get('buy_volume', 0))
+            sell_volume = float(trade_data.get('sell_volume', 0))
+            total_volume = buy_volume + sell_volume
+            
+            if total_volume > 0:
+                volume_imbalance = (buy_volume - sell_volume) / total_volume
+                buy_volume_ratio = buy_volume / total_volume
+                
+                # Обновляем буфер объемов для VPIN
+                if symbol not in self.volume_buffer:
+                    self.volume_buffer[symbol] = []
+                self.volume_buffer[symbol].append(total_volume)
+                
+                if len(self.volume_buffer[symbol]) > self.lookback_window:
+                    self.volume_buffer[symbol] = self.volume_buffer[symbol][-self.lookback_window:]
+                
+                vpin = self.calculate_vpin(buy_volume, sell_volume, self.volume_buffer[symbol])
+        
+        return volume_imbalance, buy_volume_ratio, vpin
+    
     def extract_features_from_aggregates(self, bt_data: Dict, trade_data: Optional[Dict] = None,
                                        depth_data: Optional[Dict] = None,
                                        previous_bt_data: Optional[Dict] = None) -> MarketFeatures:
@@ -263,28 +413,7 @@ class FeaturePipeline:
         )
         
         # Volume метрики из trades
-        volume_imbalance = 0.0
-        buy_volume_ratio = 0.5
-        vpin = None
-        
-        if trade_data:
-            buy_volume = float(trade_data.get('buy_volume', 0))
-            sell_volume = float(trade_data.get('sell_volume', 0))
-            total_volume = buy_volume + sell_volume
-            
-            if total_volume > 0:
-                volume_imbalance = (buy_volume - sell_volume) / total_volume
-                buy_volume_ratio = buy_volume / total_volume
-                
-                # Обновляем буфер объемов для VPIN
-                if symbol not in self.volume_buffer:
-                    self.volume_buffer[symbol] = []
-                self.volume_buffer[symbol].append(total_volume)
-                
-                if len(self.volume_buffer[symbol]) > self.lookback_window:
-                    self.volume_buffer[symbol] = self.volume_buffer[symbol][-self.lookback_window:]
-                
-                vpin = self.calculate_vpin(buy_volume, sell_volume, self.volume_buffer[symbol])
+        volume_imbalance, buy_volume_ratio, vpin = self._calculate_volume_features(symbol, trade_data)
         
         # Volatility и returns
         price_volatility = self.calculate_volatility(symbol, mid_price)
@@ -313,16 +442,20 @@ class FeaturePipeline:
             return_1s=return_1s
         )
     
-    def process_market_data_batch(self, market_data: List[Dict]) -> List[MarketFeatures]:
+    def process_market_data_batch(self, market_data: Union[List[Dict], np.ndarray]) -> List[MarketFeatures]:
         """
         Обрабатывает batch market data и извлекает фичи
         
         Args:
             market_data: Список записей из market_data_1s представления
+                или структурированный массив с dtype MARKET_DATA_DTYPE
             
         Returns:
             Список MarketFeatures
         """
+        if isinstance(market_data, np.ndarray):
+            return self._process_structured_batch(market_data)
+        
         features_list = []
         previous_data = None
         
@@ -362,6 +495,80 @@ class FeaturePipeline:
             previous_data = bt_data
             
         return features_list
+    
+    def _process_structured_batch(self, market_data: np.ndarray) -> List[MarketFeatures]:
+        """
+        Обрабатывает batch в виде структурированного массива (MARKET_DATA_DTYPE).
+        
+        Ценовые фичи без состояния (microprice, mid, spread, I1, return_1s) считаются
+        одним вызовом _price_features по столбцам; OFI, VPIN и волатильность
+        зависят от скользящих буферов и считаются в цикле, как в dict-версии.
+        """
+        bid = np.ascontiguousarray(market_data['bid_close'])
+        ask = np.ascontiguousarray(market_data['ask_close'])
+        bid_qty_arr = np.ascontiguousarray(market_data['bid_qty_close'])
+        ask_qty_arr = np.ascontiguousarray(market_data['ask_qty_close'])
+        price_features = _price_features(bid, ask, bid_qty_arr, ask_qty_arr)
+        
+        symbols = market_data['symbol'].tolist()
+        timestamps = market_data['ts_bucket'].tolist()
+        bid_close = bid.tolist()
+        ask_close = ask.tolist()
+        bid_qty = bid_qty_arr.tolist()
+        ask_qty = ask_qty_arr.tolist()
+        volume = market_data['volume'].tolist()
+        buy_ratio = market_data['buy_ratio'].tolist()
+        microprice, mid_price, spread_abs, spread_rel, i1, return_1s = (
+            price_features[:, k].tolist() for k in range(price_features.shape[1])
+        )
+        
+        features_list = []
+        previous_data = None
+        
+        for i in range(len(market_data)):
+            symbol = symbols[i]
+            current = {
+                'bid_price': bid_close[i], 'ask_price': ask_close[i],
+                'bid_qty': bid_qty[i], 'ask_qty': ask_qty[i]
+            }
+            ofi = self.calculate_ofi(current, previous_data)
+            
+            trade_data = None
+            total_vol = volume[i]
+            if total_vol == total_vol:  # не NaN
+                ratio = buy_ratio[i]
+                if ratio != ratio:
+                    ratio = 0.5
+                trade_data = {
+                    'buy_volume': total_vol * ratio,
+                    'sell_volume': total_vol * (1 - ratio)
+                }
+            volume_imbalance, buy_volume_ratio, vpin = self._calculate_volume_features(symbol, trade_data)
+            
+            ret = return_1s[i]
+            features_list.append(MarketFeatures(
+                timestamp=timestamps[i],
+                symbol=symbol,
+                microprice=microprice[i],
+                mid_price=mid_price[i],
+                spread_abs=spread_abs[i],
+                spread_rel=spread_rel[i],
+                i1=i1[i],
+                i10=i1[i],  # Упрощенная версия, используем I1 как I10
+                ofi=ofi,
+                volume_imbalance=volume_imbalance,
+                buy_volume_ratio=buy_volume_ratio,
+                vpin=vpin,
+                price_volatility=self.calculate_volatility(symbol, mid_price[i]),
+                return_1s=None if ret != ret else ret
+            ))
+            # Как и в dict-версии, OFI получает предыдущую bt-запись
+            previous_data = {
+                'bid_close': bid_close[i], 'ask_close': ask_close[i],
+                'bid_qty_close': bid_qty[i], 'ask_qty_close': ask_qty[i]
+            }
+            
+        return features_list
 
 
 class FeatureStorage:
@@ -418,7 +625,6 @@ class FeatureStorage:
         """
         
         try:
-            import asyncpg
             pool = await asyncpg.create_pool(self.connection_string)
             async with pool.acquire() as conn:
                 await conn.execute(create_table_sql)
@@ -435,12 +641,24 @@ class FeatureStorage:
         if not features_list:
             return True
             
-        insert_sql = """
-        INSERT INTO market_features (
-            ts_exchange, symbol, microprice, mid_price, spread_abs, spread_rel,
-            i1, i10, ofi, volume_imbalance, buy_volume_ratio, vpin,
-            price_volatility, return_1s
-        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+        columns = [
+            'ts_exchange', 'symbol', 'microprice', 'mid_price', 'spread_abs', 'spread_rel',
+            'i1', 'i10', 'ofi', 'volume_imbalance', 'buy_volume_ratio', 'vpin',
+            'price_volatility', 'return_1s'
+        ]
+        column_list = ', '.join(columns)
+        
+        # COPY в временную staging-таблицу + один INSERT ... SELECT с upsert
+        # вместо отдельного round-trip на каждую запись
+        stage_sql = """
+        CREATE TEMP TABLE market_features_stage
+        (LIKE market_features INCLUDING DEFAULTS) ON COMMIT DROP
+        """
+        
+        upsert_sql = f"""
+        INSERT INTO market_features ({column_list})
+        SELECT DISTINCT ON (ts_exchange, symbol) {column_list}
+        FROM market_features_stage
         ON CONFLICT (ts_exchange, symbol) DO UPDATE SET
             microprice = EXCLUDED.microprice,
             mid_price = EXCLUDED.mid_price,
@@ -456,21 +674,28 @@ class FeatureStorage:
             return_1s = EXCLUDED.return_1s
         """
         
+        records = [
+            (
+                features.timestamp, features.symbol,
+                features.microprice, features.mid_price,
+                features.spread_abs, features.spread_rel,
+                features.i1, features.i10, features.ofi,
+                features.volume_imbalance, features.buy_volume_ratio,
+                features.vpin, features.price_volatility, features.return_1s
+            )
+            for features in features_list
+        ]
+        
         try:
-            import asyncpg
             pool = await asyncpg.create_pool(self.connection_string)
             
             async with pool.acquire() as conn:
-                for features in features_list:
-                    await conn.execute(
-                        insert_sql,
-                        features.timestamp, features.symbol,
-                        features.microprice, features.mid_price,
-                        features.spread_abs, features.spread_rel,
-                        features.i1, features.i10, features.ofi,
-                        features.volume_imbalance, features.buy_volume_ratio,
-                        features.vpin, features.price_volatility, features.return_1s
+                async with conn.transaction():
+                    await conn.execute(stage_sql)
+                    await conn.copy_records_to_table(
+                        'market_features_stage', records=records, columns=columns
                     )
+                    await conn.execute(upsert_sql)
                     
             await pool.close()
             self.logger.info(f"✅ Сохранено {len(features_list)} features")
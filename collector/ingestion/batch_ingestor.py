@@ -175,97 +175,114 @@ class DatabaseManager:
                 logger.error(f"Ошибка при создании символа {symbol}: {e}")
                 raise
 
+    # Батч уходит одним INSERT ... SELECT FROM unnest(массивы колонок): один Bind вместо
+    # N сообщений executemany, Postgres разворачивает массивы на своей стороне
+    _BOOK_TICKER_SQL = """
+        INSERT INTO marketdata.book_ticker
+        (ts_exchange, ts_ingest, symbol_id, update_id, best_bid, best_ask, bid_qty, ask_qty, spread, mid)
+        SELECT * FROM unnest(
+            $1::timestamptz[], $2::timestamptz[], $3::bigint[], $4::bigint[], $5::float8[],
+            $6::float8[], $7::float8[], $8::float8[], $9::float8[], $10::float8[]
+        )
+        ON CONFLICT DO NOTHING
+    """
+
+    _TRADES_SQL = """
+        INSERT INTO marketdata.trades
+        (ts_exchange, ts_ingest, symbol_id, agg_trade_id, price, qty, is_buyer_maker)
+        SELECT * FROM unnest(
+            $1::timestamptz[], $2::timestamptz[], $3::bigint[], $4::bigint[],
+            $5::float8[], $6::float8[], $7::boolean[]
+        )
+        ON CONFLICT DO NOTHING
+    """
+
+    _DEPTH_EVENTS_SQL = """
+        INSERT INTO marketdata.depth_events
+        (ts_exchange, ts_ingest, symbol_id, first_update_id, final_update_id,
+         prev_final_update_id, bids, asks)
+        SELECT * FROM unnest(
+            $1::timestamptz[], $2::timestamptz[], $3::bigint[], $4::bigint[],
+            $5::bigint[], $6::bigint[], $7::jsonb[], $8::jsonb[]
+        )
+        ON CONFLICT DO NOTHING
+    """
+
+    async def _insert_columns(self, sql: str, rows: List[tuple]):
+        """Транспонирует строки в массивы колонок и вставляет их одним запросом."""
+        if self.pool is None:
+            raise RuntimeError("Database connection pool is not initialized (pool=None)")
+
+        columns = [list(col) for col in zip(*rows)]
+        async with self.pool.acquire() as conn:
+            await conn.execute(sql, *columns)
+
     async def batch_insert_book_ticker(self, records: List[Dict[str, Any]]):
         """Батчевая вставка book_ticker записей"""
         if not records:
             return
-        if self.pool is None:
-            raise RuntimeError("Database connection pool is not initialized (pool=None)")
 
-        async with self.pool.acquire() as conn:
-            await conn.executemany(
-                """
-                INSERT INTO marketdata.book_ticker 
-                (ts_exchange, ts_ingest, symbol_id, update_id, best_bid, best_ask, bid_qty, ask_qty, spread, mid)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                ON CONFLICT DO NOTHING
-                """,
-                [
-                    (
-                        datetime.fromtimestamp(r['ts_exchange'] / 1000, tz=timezone.utc),
-                        datetime.fromtimestamp(r['ts_ingest'] / 1000, tz=timezone.utc), 
-                        r['symbol_id'],
-                        r.get('update_id'),
-                        r['best_bid'],
-                        r['best_ask'],
-                        r['bid_qty'],
-                        r['ask_qty'],
-                        float(r['best_ask']) - float(r['best_bid']),
-                        (float(r['best_ask']) + float(r['best_bid'])) / 2.0,
-                    )
-                    for r in records
-                ],
-            )
+        await self._insert_columns(
+            self._BOOK_TICKER_SQL,
+            [
+                (
+                    datetime.fromtimestamp(r['ts_exchange'] / 1000, tz=timezone.utc),
+                    datetime.fromtimestamp(r['ts_ingest'] / 1000, tz=timezone.utc),
+                    r['symbol_id'],
+                    r.get('update_id'),
+                    r['best_bid'],
+                    r['best_ask'],
+                    r['bid_qty'],
+                    r['ask_qty'],
+                    float(r['best_ask']) - float(r['best_bid']),
+                    (float(r['best_ask']) + float(r['best_bid'])) / 2.0,
+                )
+                for r in records
+            ],
+        )
 
     async def batch_insert_trades(self, records: List[Dict[str, Any]]):
         """Батчевая вставка trades записей"""
         if not records:
             return
-        if self.pool is None:
-            raise RuntimeError("Database connection pool is not initialized (pool=None)")
 
-        async with self.pool.acquire() as conn:
-            await conn.executemany(
-                """
-                INSERT INTO marketdata.trades
-                (ts_exchange, ts_ingest, symbol_id, agg_trade_id, price, qty, is_buyer_maker)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ON CONFLICT DO NOTHING
-                """,
-                [
-                    (
-                        datetime.fromtimestamp(r['ts_exchange'] / 1000, tz=timezone.utc),
-                        datetime.fromtimestamp(r['ts_ingest'] / 1000, tz=timezone.utc),
-                        r['symbol_id'],
-                        r['agg_trade_id'],
-                        r['price'],
-                        r['qty'],
-                        r['is_buyer_maker'],
-                    )
-                    for r in records
-                ],
-            )
+        await self._insert_columns(
+            self._TRADES_SQL,
+            [
+                (
+                    datetime.fromtimestamp(r['ts_exchange'] / 1000, tz=timezone.utc),
+                    datetime.fromtimestamp(r['ts_ingest'] / 1000, tz=timezone.utc),
+                    r['symbol_id'],
+                    r['agg_trade_id'],
+                    r['price'],
+                    r['qty'],
+                    r['is_buyer_maker'],
+                )
+                for r in records
+            ],
+        )
 
     async def batch_insert_depth_events(self, records: List[Dict[str, Any]]):
         """Батчевая вставка depth_events записей"""
         if not records:
             return
-        if self.pool is None:
-            raise RuntimeError("Database connection pool is not initialized (pool=None)")
 
-        async with self.pool.acquire() as conn:
-            await conn.executemany(
-                """
-                INSERT INTO marketdata.depth_events
-                (ts_exchange, ts_ingest, symbol_id, first_update_id, final_update_id, 
-                 prev_final_update_id, bids, asks)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                ON CONFLICT DO NOTHING
-                """,
-                [
-                    (
-                        datetime.fromtimestamp(r['ts_exchange'] / 1000, tz=timezone.utc),
-                        datetime.fromtimestamp(r['ts_ingest'] / 1000, tz=timezone.utc),
-                        r['symbol_id'],
-                        r['first_update_id'],
-                        r['final_update_id'],
-                        r.get('prev_final_update_id'),
-                        json.dumps(r['bids']),
-                        json.dumps(r['asks']),
-                    )
-                    for r in records
-                ],
-            )
+        await self._insert_columns(
+            self._DEPTH_EVENTS_SQL,
+            [
+                (
+                    datetime.fromtimestamp(r['ts_exchange'] / 1000, tz=timezone.utc),
+                    datetime.fromtimestamp(r['ts_ingest'] / 1000, tz=timezone.utc),
+                    r['symbol_id'],
+                    r['first_update_id'],
+                    r['final_update_id'],
+                    r.get('prev_final_update_id'),
+                    json.dumps(r['bids']),
+                    json.dumps(r['asks']),
+                )
+                for r in records
+            ],
+        )
 
     async def close(self):
         """Закрытие пула соединений"""
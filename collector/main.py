@@ -12,7 +12,13 @@ import logging
 import sys
 from pathlib import Path
 
-from collector.websocket.binance_collector import BinanceCollector
+# uvloop: libuv-цикл событий для WebSocket-потоков (на Windows недоступен)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from collector.websocket.binance_collector import BinanceCollector, MultiSymbolBinanceCollector
 from collector.processing.orderbook_processor import OrderBookProcessor
 from collector.storage.data_manager import DataManager
 from collector.monitor.health_checker import HealthMonitor
@@ -82,6 +88,7 @@ async def main():
         # Создание компонентов для каждого символа
         collectors = []
         data_managers = []
+        processors = {}
         
         for symbol in symbols:
             # Отдельный data_manager для каждого символа
@@ -93,15 +100,25 @@ async def main():
             data_managers.append(data_manager)
             
             # Отдельный processor для каждого символа
-            processor = OrderBookProcessor(data_manager=data_manager)
-            
-            # Отдельный collector для каждого символа
-            collector = BinanceCollector(
-                symbol=symbol,
-                processor=processor,
+            processors[symbol] = OrderBookProcessor(data_manager=data_manager)
+        
+        if len(symbols) == 1:
+            collectors.append(BinanceCollector(
+                symbol=symbols[0],
+                processor=processors[symbols[0]],
                 config=config
-            )
-            collectors.append(collector)
+            ))
+        else:
+            # Несколько символов - одно combined stream соединение на каждые MAX_STREAMS
+            # символов вместо отдельного WebSocket на символ
+            step = MultiSymbolBinanceCollector.MAX_STREAMS
+            for i in range(0, len(symbols), step):
+                group = symbols[i:i + step]
+                collectors.append(MultiSymbolBinanceCollector(
+                    symbols=group,
+                    processors={s: processors[s] for s in group},
+                    config=config
+                ))
         
         # Инициализируем хранилища (PostgreSQL/CSV) до старта сбора
         try:
@@ -142,4 +159,6 @@ async def main():
 
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()
     asyncio.run(main())
\ No newline at end of file
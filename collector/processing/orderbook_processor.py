@@ -7,6 +7,7 @@
 
 import asyncio
 import logging
+import time
 from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime
 
@@ -34,12 +35,14 @@ class OrderBookProcessor:
         self.error_count = 0
         self.last_update_time = None
         
-    async def process_orderbook_update(self, data: Dict[str, Any]) -> None:
+    async def process_orderbook_update(self, data: Dict[str, Any], local_ts: Optional[int] = None) -> None:
         """
         Обработка обновления orderbook.
         
         Args:
             data: Сырые данные от Binance WebSocket
+            local_ts: Время получения в микросекундах (если не передано -
+                берется data['local_timestamp'] или текущее время)
         """
         try:
             # Валидация данных
@@ -69,7 +72,7 @@ class OrderBookProcessor:
                 await self.data_manager.save_orderbook_raw(data)
             else:
                 # Формирование упрощенной записи для CSV
-                record = self._create_record(data, best_bid, best_ask)
+                record = self._create_record(data, best_bid, best_ask, local_ts)
                 if self.logger.isEnabledFor(logging.DEBUG):
                     self.logger.debug(
                         f"Saving simplified CSV record for {data.get('s')}: bid={best_bid} ask={best_ask}"
@@ -83,6 +86,16 @@ class OrderBookProcessor:
             self.logger.error(f"Error processing orderbook update: {e}")
             self.error_count += 1
             
+    async def process_batch(self, batch: List[Tuple[Dict[str, Any], int]]) -> None:
+        """
+        Обработка пачки обновлений orderbook в порядке поступления.
+        
+        Args:
+            batch: Пары (сырые данные от Binance WebSocket, local_ts в микросекундах)
+        """
+        for data, local_ts in batch:
+            await self.process_orderbook_update(data, local_ts)
+            
     def _validate_data(self, data: Dict[str, Any]) -> bool:
         """
         Валидация входящих данных.
@@ -144,7 +157,8 @@ class OrderBookProcessor:
                 
         return best_bid, best_ask
         
-    def _create_record(self, data: Dict[str, Any], best_bid: Optional[List[float]], best_ask: Optional[List[float]]) -> Dict[str, Any]:
+    def _create_record(self, data: Dict[str, Any], best_bid: Optional[List[float]], best_ask: Optional[List[float]],
+                       local_ts: Optional[int] = None) -> Dict[str, Any]:
         """
         Создание стандартизированной записи.
         
@@ -152,15 +166,20 @@ class OrderBookProcessor:
             data: Исходные данные
             best_bid: Лучшая цена покупки [price, quantity]
             best_ask: Лучшая цена продажи [price, quantity]
+            local_ts: Время получения в микросекундах
             
         Returns:
             Стандартизированная запись
         """
+        if local_ts is None:
+            # Целые микросекунды из time_ns без float-умножения (оно сдвигает метку на ±1 мкс)
+            local_ts = data.get('local_timestamp') or time.time_ns() // 1000
+            
         return {
             'exchange': 'binance-futures',
             'symbol': data['s'],
             'timestamp': data['E'] * 1000,  # конвертация в микросекунды
-            'local_timestamp': int(data.get('local_timestamp', datetime.now().timestamp() * 1000000)),
+            'local_timestamp': int(local_ts),
             'ask_amount': best_ask[1] if best_ask else None,
             'ask_price': best_ask[0] if best_ask else None,
             'bid_price': best_bid[0] if best_bid else None,
@@ -5,15 +5,24 @@ Docker Entrypoint для PostgreSQL OrderBook Collector
 """
 
 import asyncio
+import atexit
 import os
 import sys
 import logging
+import logging.handlers
+import queue
 import signal
 import time
 from pathlib import Path
 from datetime import timedelta
 import aiohttp
-from typing import cast
+from typing import Optional, cast
+
+# uvloop: libuv-цикл событий для WS + asyncpg (на Windows недоступен)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Добавляем корневую папку в PYTHONPATH
 sys.path.insert(0, '/app')
@@ -23,17 +32,36 @@ from collector.ingestion.batch_ingestor import BatchIngestor
 from collector.monitoring.health_monitor import MonitoringSystem
 from collector.database.connection import DatabaseConnection
 
-# Настройка логирования
+# Настройка логирования: root пишет в очередь, а запись в stdout/файл
+# выполняет фоновый QueueListener — без блокирующего write() в event loop
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    logging.StreamHandler(sys.stdout),
+    logging.FileHandler('/app/logs/collector.log')
+]
+for _h in _log_handlers:
+    _h.setFormatter(_log_formatter)
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('/app/logs/collector.log')
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_listener.start()
+log_listener: Optional[logging.handlers.QueueListener] = _listener
 logger = logging.getLogger(__name__)
 
+
+def stop_log_listener():
+    """Идемпотентная остановка QueueListener (cleanup + atexit для sys.exit)."""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+
+atexit.register(stop_log_listener)
+
 class ProductionCollector:
     """Главный класс для production развертывания"""
     
@@ -44,12 +72,15 @@ class ProductionCollector:
         self.db_connection = None
         self.shutdown_event = asyncio.Event()
         self.active_symbols = []
+        # Общая HTTP-сессия для REST-запросов к Binance (создаётся лениво)
+        self._http: Optional[aiohttp.ClientSession] = None
         
         # Environment variables
         self.database_url = os.getenv('DATABASE_URL')
         self.batch_size = int(os.getenv('BATCH_SIZE', '500'))
         self.flush_interval = int(os.getenv('FLUSH_INTERVAL', '30'))
         self.shards = int(os.getenv('SHARDS', '5'))
+        self.symbols_per_shard = max(1, int(os.getenv('SYMBOLS_PER_SHARD', '50')))
         self.monitoring_port = int(os.getenv('MONITORING_PORT', '8000'))
         self.binance_base_url = os.getenv('BINANCE_BASE_URL', 'https://fapi.binance.com').strip()
         self.binance_ws_url = os.getenv('BINANCE_WS_URL', 'wss://fstream.binance.com/ws/').strip()
@@ -136,7 +167,8 @@ class ProductionCollector:
             logger.info(f"✅ Resolved {len(resolved)} valid Futures symbols out of {len(SYMBOLS_200)}")
             # Порядок: используем исходный порядок SYMBOLS_200 (убывание ликвидности),
             # но ротируем так, чтобы STARTING_SYMBOL был первым, а далее — менее ликвидные
-            base_order = [s for s in SYMBOLS_200 if s in set(resolved)]
+            resolved_set = frozenset(resolved)
+            base_order = [s for s in SYMBOLS_200 if s in resolved_set]
             if self.starting_symbol in base_order:
                 idx = base_order.index(self.starting_symbol)
                 ordered = base_order[idx:] + base_order[:idx]
@@ -157,25 +189,33 @@ class ProductionCollector:
             logger.error(f"❌ Symbol validation failed: {e}")
             raise
 
+    async def _get_http(self) -> aiohttp.ClientSession:
+        """Ленивая общая ClientSession: TCP/TLS/DNS переиспользуются между REST-вызовами."""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=10),
+                connector=aiohttp.TCPConnector(ttl_dns_cache=300, limit=8),
+            )
+        return self._http
+
     async def _resolve_futures_symbols(self, candidates):
         """Запросить список доступных USDT-перпетуальных символов на Binance Futures и отфильтровать кандидатов."""
         base = self.binance_base_url.rstrip('/')
         url = f"{base}/fapi/v1/exchangeInfo"
-        timeout = aiohttp.ClientTimeout(total=10)
         try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(url) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    symbols = data.get('symbols', [])
-                    allowed = set(
-                        s.get('symbol') for s in symbols
-                        if s.get('contractType') in ('PERPETUAL', 'CURRENT_QUARTER', 'NEXT_QUARTER')
-                        and s.get('status') == 'TRADING'
-                        and s.get('quoteAsset') == 'USDT'
-                    )
-                    filtered = [sym for sym in candidates if sym in allowed]
-                    return filtered
+            session = await self._get_http()
+            async with session.get(url) as resp:
+                resp.raise_for_status()
+                data = await resp.json()
+                symbols = data.get('symbols', [])
+                allowed = set(
+                    s.get('symbol') for s in symbols
+                    if s.get('contractType') in ('PERPETUAL', 'CURRENT_QUARTER', 'NEXT_QUARTER')
+                    and s.get('status') == 'TRADING'
+                    and s.get('quoteAsset') == 'USDT'
+                )
+                filtered = [sym for sym in candidates if sym in allowed]
+                return filtered
         except Exception as e:
             logger.error(f"❌ Failed to resolve futures symbols from {url}: {e}. Fallback to original list.")
             return list(candidates)
@@ -196,38 +236,45 @@ class ProductionCollector:
         channels_main = ['bookTicker', 'aggTrade']
         symbols_main = self.active_symbols if self.active_symbols else SYMBOLS_200
         db_url: str = str(self.database_url)
+        # Шардирование по фактическому числу символов: SHARDS — верхняя граница
+        shards_main = max(1, min(self.shards, -(-len(symbols_main) // self.symbols_per_shard)))
         main_ingestor = BatchIngestor(
             db_connection_string=db_url,
             symbols=symbols_main,
             channels=channels_main,
-            shards_count=self.shards,
+            shards_count=shards_main,
             ws_base_url=self.binance_ws_url,
         )
         self.ingestors.append(main_ingestor)
         asyncio.create_task(main_ingestor.start())
-        logger.info(f"✅ Main ingestor (bt/tr) started with {len(symbols_main)} symbols")
+        logger.info(
+            f"✅ Main ingestor (bt/tr) started with {len(symbols_main)} symbols "
+            f"(shards={shards_main}, max={self.shards}, per_shard={self.symbols_per_shard})"
+        )
 
     # 2) Depth-инжестор: diff depth@100ms для всех активных символов по умолчанию (FULL DATA)
         if self.enable_depth:
-            # FULL DATA по всем активным символам: игнорируем DEPTH_TOP_SYMBOLS, чтобы не было скрытых ограничений
-            depth_symbols = list(self.active_symbols) if self.active_symbols else list(SYMBOLS_200)
+            # Без разрешённых фьючерсных символов depth-подписки заведомо не нужны:
+            # не поднимаем второй BatchIngestor (шард, пул БД) вхолостую
+            if not self.active_symbols:
+                logger.warning("Skipping depth ingestor: no active futures symbols resolved")
+                return
 
-            if depth_symbols:
-                db_url: str = str(self.database_url)
-                # Шардирование: 1 шард на каждые ~20 символов, минимум 1, максимум 5
-                shards_for_depth = max(1, min(5, (len(depth_symbols) + 19) // 20))
-                depth_ingestor = BatchIngestor(
-                    db_connection_string=db_url,
-                    symbols=depth_symbols,
-                    channels=['depth@100ms'],
-                    shards_count=shards_for_depth,
-                    ws_base_url=self.binance_ws_url,
-                )
-                self.ingestors.append(depth_ingestor)
-                asyncio.create_task(depth_ingestor.start())
-                logger.info(f"🧊 Depth ingestor started for {len(depth_symbols)} symbols (FULL DATA, shards={shards_for_depth})")
-            else:
-                logger.warning("ENABLE_DEPTH=true, но список depth символов пуст — depth не запущен")
+            # FULL DATA по всем активным символам: игнорируем DEPTH_TOP_SYMBOLS, чтобы не было скрытых ограничений
+            depth_symbols = list(symbols_main)
+            db_url: str = str(self.database_url)
+            # Шардирование: 1 шард на каждые ~20 символов, минимум 1, максимум 5
+            shards_for_depth = max(1, min(5, (len(depth_symbols) + 19) // 20))
+            depth_ingestor = BatchIngestor(
+                db_connection_string=db_url,
+                symbols=depth_symbols,
+                channels=['depth@100ms'],
+                shards_count=shards_for_depth,
+                ws_base_url=self.binance_ws_url,
+            )
+            self.ingestors.append(depth_ingestor)
+            asyncio.create_task(depth_ingestor.start())
+            logger.info(f"🧊 Depth ingestor started for {len(depth_symbols)} symbols (FULL DATA, shards={shards_for_depth})")
     
     async def start_health_monitor(self):
         """Запуск health monitoring dashboard"""
@@ -321,14 +368,17 @@ class ProductionCollector:
     
     async def wait_for_shutdown(self):
         """Ожидание сигнала на завершение"""
-        def signal_handler(signum, frame):
-            logger.info(f"📡 Received signal {signum}, initiating shutdown...")
-            self.shutdown_event.set()
-        
-        signal.signal(signal.SIGTERM, signal_handler)
-        signal.signal(signal.SIGINT, signal_handler)
+        # Обработчик выполняется в самом event loop, а не в контексте сигнала
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self._on_signal, sig)
         
         await self.shutdown_event.wait()
+
+    def _on_signal(self, signum):
+        """Callback для loop.add_signal_handler"""
+        logger.info(f"📡 Received signal {signum}, initiating shutdown...")
+        self.shutdown_event.set()
     
     async def cleanup(self):
         """Graceful shutdown всех компонентов"""
@@ -348,10 +398,15 @@ class ProductionCollector:
         if self.db_connection:
             tasks.append(self.db_connection.close())
         
+        if self._http and not self._http.closed:
+            tasks.append(self._http.close())
+        
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
         
         logger.info("✅ Cleanup completed")
+        # Сбрасываем хвост очереди логов в stdout/файл
+        stop_log_listener()
     
     async def run(self):
         """Главный цикл приложения"""
@@ -420,7 +475,14 @@ async def main():
                     ssl_ctx = ctx
             except Exception:
                 ssl_ctx = None
-            conn = await asyncpg.connect(database_url, ssl=ssl_ctx)
+            # Дешёвая TCP-проверка: пока PG не слушает порт, не тратим попытку на полный handshake (auth + SSL)
+            pg_host = parsed.hostname or 'localhost'
+            pg_port = parsed.port or 5432
+            _, writer = await asyncio.wait_for(asyncio.open_connection(pg_host, pg_port), 2)
+            writer.close()
+            await writer.wait_closed()
+            # Порт открыт — один полный connect для подтверждения авторизации
+            conn = await asyncpg.connect(database_url, ssl=ssl_ctx, timeout=5)
             await conn.close()
             logger.info("✅ PostgreSQL is ready!")
             break
@@ -440,4 +502,6 @@ async def main():
     await collector.run()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if uvloop is not None:
+        uvloop.install()
+    asyncio.run(main())
@@ -6,13 +6,12 @@
 Использование:
     python collector/scripts/run_feature_pipeline.py --symbol BTCUSDT --hours 1
     python collector/scripts/run_feature_pipeline.py --all-symbols --hours 24 --output features.csv
+    python collector/scripts/run_feature_pipeline.py --all-symbols --hours 24 --output features.parquet
 """
 
 import asyncio
 import argparse
 import sys
-import json
-import csv
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
@@ -21,96 +20,188 @@ from typing import List, Dict, Optional
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 try:
-    from collector.features import FeaturePipeline, FeatureStorage
+    import asyncpg
+    import numpy as np
+    import orjson
+    import pandas as pd
+    from collector.features import (
+        FeaturePipeline, FeatureStorage, MARKET_DATA_DTYPE, FEATURES_DTYPE, features_to_array
+    )
     from collector.aggregates import AggregateManager
     print("✅ Модули feature pipeline импортированы")
 except ImportError as e:
     print(f"❌ Ошибка импорта: {e}")
-    print("Установите зависимости: pip install numpy pandas asyncpg")
+    print("Установите зависимости: pip install numpy pandas asyncpg orjson")
     sys.exit(1)
 
+# uvloop опционален: libuv-цикл событий для asyncpg (на Windows недоступен)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Numba опционален: без него статистика считается векторно через NumPy
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _column_stats_numpy(values):
+    """count/mean/std/min/max по столбцам (NaN пропускаются), реализация на NumPy"""
+    counts = np.count_nonzero(~np.isnan(values), axis=0)
+    n_cols = values.shape[1]
+    means = np.full(n_cols, np.nan)
+    stds = np.full(n_cols, np.nan)
+    mins = np.full(n_cols, np.nan)
+    maxs = np.full(n_cols, np.nan)
+    present = np.flatnonzero(counts)
+    if present.size:
+        valid = values[:, present]
+        means[present] = np.nanmean(valid, axis=0)
+        stds[present] = np.nanstd(valid, axis=0)
+        mins[present] = np.nanmin(valid, axis=0)
+        maxs[present] = np.nanmax(valid, axis=0)
+    return counts, means, stds, mins, maxs
+
+
+def _column_stats_kernel(values):
+    """Один проход по массиву: Welford для mean/std + running min/max (NaN пропускаются)"""
+    n_rows, n_cols = values.shape
+    counts = np.zeros(n_cols, dtype=np.int64)
+    means = np.zeros(n_cols)
+    m2 = np.zeros(n_cols)
+    mins = np.full(n_cols, np.inf)
+    maxs = np.full(n_cols, -np.inf)
+    for i in range(n_rows):
+        for j in range(n_cols):
+            x = values[i, j]
+            if x != x:  # NaN
+                continue
+            counts[j] += 1
+            delta = x - means[j]
+            means[j] += delta / counts[j]
+            m2[j] += delta * (x - means[j])
+            if x < mins[j]:
+                mins[j] = x
+            if x > maxs[j]:
+                maxs[j] = x
+    stds = np.empty(n_cols)
+    for j in range(n_cols):
+        if counts[j] > 0:
+            stds[j] = np.sqrt(m2[j] / counts[j])
+        else:
+            means[j] = np.nan
+            stds[j] = np.nan
+            mins[j] = np.nan
+            maxs[j] = np.nan
+    return counts, means, stds, mins, maxs
+
+
+# fastmath не используется: он разрешает компилятору считать, что NaN не бывает
+_column_stats = njit(cache=True)(_column_stats_kernel) if njit is not None else _column_stats_numpy
+
 class MLFeaturePipeline:
     """Полный pipeline для подготовки ML данных"""
     
+    # SQL-запросы собираются один раз при загрузке класса
+    _Q_RANGE = """
+        SELECT 
+            ts_bucket,
+            symbol,
+            bid_close,
+            ask_close,
+            spread_avg,
+            microprice_avg,
+            bt_ticks,
+            price_close,
+            volume,
+            trade_count,
+            vwap,
+            buy_ratio,
+            depth_updates
+        FROM market_data_1s 
+        WHERE symbol = $1
+        AND ts_bucket BETWEEN $2 AND $3
+        ORDER BY ts_bucket ASC
+    """
+    
+    _Q_SYMBOLS = """
+        SELECT DISTINCT symbol 
+        FROM market_data_1s 
+        ORDER BY symbol
+    """
+    
     def __init__(self, connection_string: str):
         self.connection_string = connection_string
         self.aggregate_manager = AggregateManager(connection_string)
         self.feature_pipeline = FeaturePipeline()
         self.feature_storage = FeatureStorage(connection_string)
+        # Общий пул соединений на весь запуск (создается в initialize())
+        self.pool = None
+        
+    async def initialize(self):
+        """Создает общий asyncpg pool для всех запросов pipeline"""
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                self.connection_string,
+                min_size=2,
+                max_size=10,
+                statement_cache_size=1024,
+                init=self._init_connection
+            )
+        return self.pool
+    
+    @staticmethod
+    async def _init_connection(conn):
+        """Регистрирует кодеки один раз на соединение: numeric -> float, jsonb через orjson"""
+        await conn.set_type_codec(
+            'numeric', encoder=str, decoder=float,
+            schema='pg_catalog', format='text'
+        )
+        await conn.set_type_codec(
+            'jsonb', encoder=lambda value: orjson.dumps(value).decode(), decoder=orjson.loads,
+            schema='pg_catalog', format='text'
+        )
+    
+    async def close(self):
+        """Закрывает общий pool"""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
         
     async def get_market_data_range(self, symbol: str, start_time: datetime, 
-                                  end_time: datetime) -> List[Dict]:
-        """Получает market data за указанный период"""
+                                  end_time: datetime) -> np.ndarray:
+        """Получает market data за указанный период (структурированный массив MARKET_DATA_DTYPE)"""
         
         try:
-            import asyncpg
-            pool = await asyncpg.create_pool(self.connection_string)
-            
-            query = """
-            SELECT 
-                ts_bucket,
-                symbol,
-                bid_close,
-                ask_close,
-                spread_avg,
-                microprice_avg,
-                bt_ticks,
-                price_close,
-                volume,
-                trade_count,
-                vwap,
-                buy_ratio,
-                depth_updates
-            FROM market_data_1s 
-            WHERE symbol = $1
-            AND ts_bucket BETWEEN $2 AND $3
-            ORDER BY ts_bucket ASC
-            """
+            pool = await self.initialize()
             
+            # Prepared statement + server-side cursor: строки читаются порциями,
+            # numeric уже декодирован в float кодеком соединения.
+            # Record берется как кортеж по позициям столбцов, без промежуточного dict;
+            # bid/ask_qty_close в market_data_1s нет — дополняем константой 1.0
+            rows = []
             async with pool.acquire() as conn:
-                rows = await conn.fetch(query, symbol, start_time, end_time)
-                
-            await pool.close()
-            
-            # Конвертируем в список словарей
-            result = []
-            for row in rows:
-                record = dict(row)
-                # Конвертируем Decimal в float
-                for key, value in record.items():
-                    if hasattr(value, '__float__'):
-                        record[key] = float(value)
-                    elif isinstance(value, datetime):
-                        record[key] = value
-                        
-                # Добавляем недостающие поля если они None
-                record['bid_qty_close'] = record.get('bid_qty_close', 1.0)
-                record['ask_qty_close'] = record.get('ask_qty_close', 1.0) 
-                result.append(record)
+                stmt = await conn.prepare(self._Q_RANGE)
+                async with conn.transaction():
+                    async for row in stmt.cursor(symbol, start_time, end_time, prefetch=5000):
+                        rows.append(tuple(row) + (1.0, 1.0))
                 
-            return result
+            return np.array(rows, dtype=MARKET_DATA_DTYPE)
             
         except Exception as e:
             print(f"❌ Ошибка получения market data: {e}")
-            return []
+            return np.empty(0, dtype=MARKET_DATA_DTYPE)
     
     async def get_all_symbols(self) -> List[str]:
         """Получает список всех доступных символов"""
         
         try:
-            import asyncpg
-            pool = await asyncpg.create_pool(self.connection_string)
-            
-            query = """
-            SELECT DISTINCT symbol 
-            FROM market_data_1s 
-            ORDER BY symbol
-            """
+            pool = await self.initialize()
             
             async with pool.acquire() as conn:
-                rows = await conn.fetch(query)
-                
-            await pool.close()
+                rows = await conn.fetch(self._Q_SYMBOLS)
             
             return [row['symbol'] for row in rows]
             
@@ -119,17 +210,17 @@ class MLFeaturePipeline:
             return []
     
     async def process_symbol_features(self, symbol: str, start_time: datetime,
-                                    end_time: datetime, store_db: bool = False) -> List[Dict]:
-        """Обрабатывает фичи для одного символа"""
+                                    end_time: datetime, store_db: bool = False) -> np.ndarray:
+        """Обрабатывает фичи для одного символа (структурированный массив FEATURES_DTYPE)"""
         
         print(f"📊 Обработка {symbol}: {start_time} - {end_time}")
         
         # Получаем market data
         market_data = await self.get_market_data_range(symbol, start_time, end_time)
         
-        if not market_data:
+        if len(market_data) == 0:
             print(f"⚠️ Нет данных для {symbol}")
-            return []
+            return np.empty(0, dtype=FEATURES_DTYPE)
             
         print(f"   📈 Найдено {len(market_data)} записей")
         
@@ -147,12 +238,13 @@ class MLFeaturePipeline:
             else:
                 print(f"   ⚠️ Ошибка сохранения в БД")
         
-        # Конвертируем в словари для экспорта
-        return [features.to_dict() for features in features_list]
+        # Упаковываем в массив для экспорта (≈100 байт/строка вместо dict)
+        return features_to_array(features_list)
     
     async def run_pipeline(self, symbols: List[str], hours: int, 
                          output_file: Optional[str] = None,
-                         store_db: bool = False) -> List[Dict]:
+                         store_db: bool = False,
+                         concurrency: int = 8) -> np.ndarray:
         """Запускает полный pipeline для списка символов"""
         
         print("🚀 Запуск ML Feature Pipeline")
@@ -164,71 +256,99 @@ class MLFeaturePipeline:
         print(f"📅 Период: {start_time} - {end_time} ({hours} часов)")
         print(f"🎯 Символы: {', '.join(symbols)}")
         
-        all_features = []
+        chunks = []
         
-        for symbol in symbols:
-            try:
-                features = await self.process_symbol_features(
+        # Символы независимы и упираются в I/O БД: обрабатываем параллельно,
+        # ограничивая число одновременных запросов размером пула
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def process_one(symbol: str) -> np.ndarray:
+            async with semaphore:
+                return await self.process_symbol_features(
                     symbol, start_time, end_time, store_db
                 )
-                all_features.extend(features)
-                
-            except Exception as e:
-                print(f"❌ Ошибка обработки {symbol}: {e}")
+        
+        results = await asyncio.gather(
+            *(process_one(symbol) for symbol in symbols),
+            return_exceptions=True
+        )
+        
+        for symbol, features in zip(symbols, results):
+            if isinstance(features, BaseException):
+                print(f"❌ Ошибка обработки {symbol}: {features}")
                 continue
+            chunks.append(features)
+        
+        # Один concatenate в конце вместо наращивания списка словарей
+        all_features = np.concatenate(chunks) if chunks else np.empty(0, dtype=FEATURES_DTYPE)
         
         print(f"\n📊 Итого обработано: {len(all_features)} фичей")
         
         # Сохраняем в файл если указан
-        if output_file and all_features:
+        if output_file and len(all_features):
             await self.save_features_to_file(all_features, output_file)
         
         return all_features
     
-    async def save_features_to_file(self, features: List[Dict], filename: str):
-        """Сохраняет фичи в файл (CSV или JSON)"""
+    async def save_features_to_file(self, features: np.ndarray, filename: str):
+        """Сохраняет фичи в файл (CSV/CSV.GZ, JSON Lines или Parquet)"""
         
-        if not features:
+        if len(features) == 0:
             print("⚠️ Нет фичей для сохранения")
             return
             
         file_path = Path(filename)
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        if filename.endswith('.csv'):
-            # Сохраняем в CSV
-            with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                if features:
-                    writer = csv.DictWriter(f, fieldnames=features[0].keys())
-                    writer.writeheader()
-                    writer.writerows(features)
+        if filename.endswith(('.csv', '.csv.gz')):
+            # Сохраняем в CSV: DataFrame пишется по столбцам в C-коде pandas
+            df = pd.DataFrame(features)
+            df.to_csv(
+                file_path,
+                index=False,
+                compression='gzip' if filename.endswith('.gz') else None
+            )
                     
             print(f"📄 Фичи сохранены в CSV: {file_path}")
             
-        elif filename.endswith('.json'):
-            # Сохраняем в JSON
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(features, f, indent=2, default=str)
+        elif filename.endswith(('.json', '.jsonl', '.ndjson')):
+            # Сохраняем в JSON Lines: одна запись на строку, без сборки всего документа в памяти
+            # NaN (отсутствующие значения) orjson сериализует как null
+            names = features.dtype.names
+            with open(file_path, 'wb') as f:
+                for row in features.tolist():
+                    f.write(orjson.dumps(dict(zip(names, row)), default=str))
+                    f.write(b'\n')
                 
-            print(f"📄 Фичи сохранены в JSON: {file_path}")
+            print(f"📄 Фичи сохранены в JSON Lines: {file_path}")
+            
+        elif filename.endswith('.parquet'):
+            # Сохраняем в Parquet: колоночный бинарный формат со сжатием zstd
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(pd.DataFrame(features), preserve_index=False)
+            pq.write_table(table, file_path, compression='zstd', use_dictionary=True)
+            
+            print(f"📄 Фичи сохранены в Parquet: {file_path}")
             
         else:
             print(f"❌ Неподдерживаемый формат файла: {filename}")
     
-    async def generate_feature_summary(self, features: List[Dict]) -> Dict:
+    async def generate_feature_summary(self, features: np.ndarray) -> Dict:
         """Генерирует сводку по вычисленным фичам"""
         
-        if not features:
+        if len(features) == 0:
             return {}
-            
-        import numpy as np
         
+        # Символы и диапазон времени — по столбцам массива, без обхода словарей
+        # (timestamp в ISO-формате одной зоны, поэтому строковое сравнение корректно)
+        timestamps = features['timestamp'].tolist()
         summary = {
             'total_records': len(features),
-            'symbols': list(set(f['symbol'] for f in features)),
+            'symbols': np.unique(features['symbol']).tolist(),
             'time_range': {
-                'start': min(f['timestamp'] for f in features),
-                'end': max(f['timestamp'] for f in features)
+                'start': min(timestamps),
+                'end': max(timestamps)
             },
             'feature_stats': {}
         }
@@ -237,15 +357,20 @@ class MLFeaturePipeline:
         numeric_features = ['microprice', 'spread_rel', 'i1', 'ofi', 'volume_imbalance', 
                           'buy_volume_ratio', 'price_volatility']
         
-        for feature in numeric_features:
-            values = [f[feature] for f in features if f[feature] is not None]
-            if values:
+        # Столбцы уже лежат в массиве (None -> NaN): собираем матрицу (n, k)
+        # и считаем все статистики одним ядром по столбцам
+        values = np.column_stack([features[name] for name in numeric_features])
+        
+        counts, means, stds, mins, maxs = _column_stats(values)
+        
+        for col, feature in enumerate(numeric_features):
+            if counts[col]:
                 summary['feature_stats'][feature] = {
-                    'count': len(values),
-                    'mean': float(np.mean(values)),
-                    'std': float(np.std(values)),
-                    'min': float(np.min(values)),
-                    'max': float(np.max(values))
+                    'count': int(counts[col]),
+                    'mean': float(means[col]),
+                    'std': float(stds[col]),
+                    'min': float(mins[col]),
+                    'max': float(maxs[col])
                 }
         
         return summary
@@ -260,7 +385,7 @@ async def main():
     parser.add_argument('--hours', type=int, default=1, 
                        help='Количество часов истории (по умолчанию: 1)')
     parser.add_argument('--output', type=str, 
-                       help='Файл для сохранения (CSV или JSON)')
+                       help='Файл для сохранения (CSV, JSON Lines или Parquet)')
     parser.add_argument('--store-db', action='store_true',
                        help='Сохранить фичи в базу данных')
     parser.add_argument('--summary', action='store_true',
@@ -299,7 +424,7 @@ async def main():
         )
         
         # Показываем сводку
-        if args.summary and features:
+        if args.summary and len(features):
             print("\n📋 Сводка по фичам:")
             print("=" * 40)
             
@@ -323,6 +448,10 @@ async def main():
     except Exception as e:
         print(f"❌ Критическая ошибка: {e}")
         sys.exit(1)
+    finally:
+        await pipeline.close()
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()
     asyncio.run(main())
\ No newline at end of file
@@ -75,6 +75,8 @@ COMMENT ON COLUMN marketdata.book_ticker.spread_bps IS 'Спред в базис
 -- Индексы для book_ticker
 CREATE INDEX idx_book_ticker_time ON marketdata.book_ticker (symbol_id, ts_exchange);
 CREATE INDEX idx_book_ticker_ingest ON marketdata.book_ticker (ts_ingest);
+-- BRIN по времени: вставки монотонны, сканы "последних N минут" читают 1-2 диапазона
+CREATE INDEX idx_book_ticker_brin ON marketdata.book_ticker USING BRIN (ts_exchange) WITH (pages_per_range = 8);
 
 -- ===============================================
 -- 3. АГРЕГИРОВАННЫЕ СДЕЛКИ
@@ -128,6 +130,7 @@ COMMENT ON COLUMN marketdata.depth_events.asks IS 'Массив изменени
 -- Индексы для depth_events
 CREATE INDEX idx_depth_events_time ON marketdata.depth_events (symbol_id, ts_exchange);
 CREATE INDEX idx_depth_events_update_id ON marketdata.depth_events (symbol_id, final_update_id);
+CREATE INDEX idx_depth_events_brin ON marketdata.depth_events USING BRIN (ts_exchange) WITH (pages_per_range = 8);
 -- Дублирующий уникальный индекс для ускорения ON CONFLICT, если PK уже определяет уникальность
 -- CREATE UNIQUE INDEX IF NOT EXISTS uq_depth_events_symbol_time_final ON marketdata.depth_events (symbol_id, ts_exchange, final_update_id);
 
@@ -181,6 +184,7 @@ COMMENT ON COLUMN marketdata.orderbook_topN.ofi_1s IS 'Order Flow Imbalance за
 
 -- Индексы для orderbook_topN
 CREATE INDEX idx_orderbook_topN_time ON marketdata.orderbook_topN (symbol_id, ts_exchange);
+CREATE INDEX idx_orderbook_topN_brin ON marketdata.orderbook_topN USING BRIN (ts_exchange) WITH (pages_per_range = 8);
 
 -- ===============================================
 -- 6. АГРЕГАТЫ BOOK_TICKER (1 СЕКУНДА)
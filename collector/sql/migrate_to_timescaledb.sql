@@ -234,6 +234,17 @@ ON marketdata.bt_1s (symbol_id, ts_second);
 CREATE INDEX IF NOT EXISTS idx_trade_1s_time 
 ON marketdata.trade_1s (symbol_id, ts_second);
 
+-- BRIN по ts_exchange для сканов "последних N минут" (вставки монотонны по времени);
+-- btree (symbol_id, ts_exchange) остается для запросов по конкретному символу
+CREATE INDEX IF NOT EXISTS idx_orderbook_topN_brin 
+ON marketdata.orderbook_topN USING BRIN (ts_exchange) WITH (pages_per_range = 8);
+
+CREATE INDEX IF NOT EXISTS idx_depth_events_brin 
+ON marketdata.depth_events USING BRIN (ts_exchange) WITH (pages_per_range = 8);
+
+CREATE INDEX IF NOT EXISTS idx_book_ticker_brin 
+ON marketdata.book_ticker USING BRIN (ts_exchange) WITH (pages_per_range = 8);
+
 -- ===============================================
 -- CONTINUOUS AGGREGATES (Materialized Views)
 -- ===============================================
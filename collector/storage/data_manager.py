@@ -4,15 +4,23 @@
 """
 
 import asyncio
-import csv
 import gzip
 import json
 import logging
 import os
-from datetime import datetime, timedelta
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Union, TextIO
-from io import TextIOWrapper
+from typing import Dict, Any, Optional, List, BinaryIO
+
+# zstandard для сжатия CSV (fallback на gzip, если модуль не установлен)
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
 
 # PostgreSQL поддержка
 try:
@@ -22,6 +30,29 @@ except ImportError:
     POSTGRES_AVAILABLE = False
 
 
+@dataclass(frozen=True, slots=True)
+class DBEnvConfig:
+    """Параметры PostgreSQL из переменных окружения (читаются один раз на процесс)"""
+    host: Optional[str]
+    port: int
+    name: Optional[str]
+    user: Optional[str]
+    password: Optional[str]
+    sslmode: str
+    
+    @classmethod
+    @lru_cache(maxsize=1)
+    def from_env(cls) -> 'DBEnvConfig':
+        return cls(
+            host=os.getenv('DB_HOST'),
+            port=int(os.getenv('DB_PORT', 25060)),
+            name=os.getenv('DB_NAME'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            sslmode=os.getenv('DB_SSLMODE', 'require')
+        )
+
+
 class DataManager:
     """
     Менеджер для сохранения и управления данными orderbook.
@@ -48,6 +79,10 @@ class DataManager:
         # Определяем тип хранения
         storage_config = self.config.get('storage', {})
         self.storage_type = storage_config.get('type', 'csv')
+        # Кодек сжатия CSV: zstd (по умолчанию) или gzip
+        self.compression = storage_config.get('compression', 'zstd')
+        if self.compression == 'zstd' and not ZSTD_AVAILABLE:
+            self.compression = 'gzip'
         
         # Инициализация PostgreSQL Manager
         self.postgres_manager = None
@@ -60,10 +95,10 @@ class DataManager:
         self.rotation_hours = storage_config.get('rotation_hours', 24)
         
         # Состояние для CSV
-        self.current_file: Optional[Union[TextIO, TextIOWrapper]] = None
-        self.current_writer = None
-        self.file_rotation_time = None
-        self.buffer = []
+        self.current_file: Optional[BinaryIO] = None
+        self._rotation_deadline: Optional[float] = None  # time.monotonic() следующей ротации
+        self.buffer = bytearray()  # уже сериализованные строки CSV
+        self.buffered_records = 0
         self.buffer_size = storage_config.get('buffer_size', 1000)
         self.records_written = 0
         self.files_created = 0  # Добавляем для всех режимов
@@ -76,16 +111,11 @@ class DataManager:
             
             # Если нет конфигурации в файле, пытаемся из переменных окружения
             if not db_config.get('host'):
-                import os
+                storage_config = self.config.get('storage', {})
                 db_config = {
-                    'host': os.getenv('DB_HOST'),
-                    'port': int(os.getenv('DB_PORT', 25060)),
-                    'name': os.getenv('DB_NAME'),
-                    'user': os.getenv('DB_USER'),
-                    'password': os.getenv('DB_PASSWORD'),
-                    'sslmode': os.getenv('DB_SSLMODE', 'require'),
-                    'batch_size': self.config.get('storage', {}).get('batch_size', 100),
-                    'flush_interval': self.config.get('storage', {}).get('flush_interval', 5),
+                    **asdict(DBEnvConfig.from_env()),
+                    'batch_size': storage_config.get('batch_size', 100),
+                    'flush_interval': storage_config.get('flush_interval', 5),
                     'pool_size': self.config.get('postgresql', {}).get('pool_size', 20)
                 }
             
@@ -119,11 +149,12 @@ class DataManager:
         self.records_written = 0
         self.files_created = 0
         
-        # CSV заголовки
+        # CSV заголовки (схема фиксирована, строки форматируются без csv.DictWriter)
         self.csv_headers = [
             'exchange', 'symbol', 'timestamp', 'local_timestamp',
             'ask_amount', 'ask_price', 'bid_price', 'bid_amount'
         ]
+        self._csv_header_bytes = (','.join(self.csv_headers) + '\r\n').encode('utf-8')
         
     async def save_record(self, record: Dict[str, Any]) -> None:
         """
@@ -170,7 +201,7 @@ class DataManager:
                 'exchange': 'binance-futures',
                 'symbol': raw.get('s', 'UNKNOWN'),
                 'timestamp': raw.get('E', 0) * 1000,
-                'local_timestamp': int(datetime.now().timestamp() * 1_000_000),
+                'local_timestamp': time.time_ns() // 1000,
                 'ask_amount': float(raw['a'][0][1]) if raw.get('a') else None,
                 'ask_price': float(raw['a'][0][0]) if raw.get('a') else None,
                 'bid_price': float(raw['b'][0][0]) if raw.get('b') else None,
@@ -224,11 +255,12 @@ class DataManager:
         # Проверка необходимости ротации файла
         await self._check_file_rotation(record)
         
-        # Добавление в буфер
-        self.buffer.append(record)
+        # Добавление в буфер сразу в виде байтов строки CSV (без хранения dict)
+        self.buffer += self._format_csv_row(record)
+        self.buffered_records += 1
         
         # Запись буфера при достижении лимита
-        if len(self.buffer) >= self.buffer_size:
+        if self.buffered_records >= self.buffer_size:
             await self._flush_buffer()
             
     async def _check_file_rotation(self, record: Dict[str, Any]) -> None:
@@ -238,13 +270,11 @@ class DataManager:
         Args:
             record: Текущая запись
         """
-        current_time = datetime.now()
-        
         # Создание нового файла если:
         # 1. Файл еще не создан
-        # 2. Прошло время ротации
+        # 2. Прошло время ротации (монотонные часы, без datetime на каждую запись)
         if (self.current_file is None or 
-            (self.file_rotation_time and current_time >= self.file_rotation_time)):
+            (self._rotation_deadline is not None and time.monotonic() >= self._rotation_deadline)):
             
             await self._close_current_file()
             await self._create_new_file(record)
@@ -265,27 +295,24 @@ class DataManager:
             filename = f"{symbol}_orderbook_{timestamp_str}.csv"
             
             if self.compress:
-                filename += ".gz"
+                filename += ".zst" if self.compression == 'zstd' else ".gz"
             
             filepath = self.output_dir / filename
             
-            # Открытие файла
-            if self.compress:
-                self.current_file = gzip.open(filepath, 'wt', encoding='utf-8')
+            # Открытие файла в бинарном режиме: строки пишутся готовыми байтами
+            if self.compress and self.compression == 'zstd':
+                cctx = zstd.ZstdCompressor(level=3, threads=-1)
+                self.current_file = cctx.stream_writer(open(filepath, 'wb'))
+            elif self.compress:
+                self.current_file = gzip.open(filepath, 'wb', compresslevel=1)
             else:
-                self.current_file = open(filepath, 'w', encoding='utf-8')
-            
-            # Создание CSV writer
-            self.current_writer = csv.DictWriter(
-                self.current_file, 
-                fieldnames=self.csv_headers
-            )
+                self.current_file = open(filepath, 'wb')
             
             # Запись заголовков
-            self.current_writer.writeheader()
+            self.current_file.write(self._csv_header_bytes)
             
             # Установка времени следующей ротации
-            self.file_rotation_time = current_time + timedelta(hours=self.rotation_hours)
+            self._rotation_deadline = time.monotonic() + self.rotation_hours * 3600
             
             self.files_created += 1
             self.logger.info(f"📝 Создан новый файл: {filename}")
@@ -295,23 +322,38 @@ class DataManager:
         except Exception as e:
             self.logger.error(f"Error creating new file: {e}")
             
+    def _format_csv_row(self, record: Dict[str, Any]) -> bytes:
+        """
+        Форматирование записи в строку CSV (как csv.DictWriter: None -> пустое поле).
+        
+        Args:
+            record: Запись orderbook
+            
+        Returns:
+            Строка CSV в UTF-8 с завершающим CRLF
+        """
+        return (','.join(
+            '' if (value := record.get(header)) is None else str(value)
+            for header in self.csv_headers
+        ) + '\r\n').encode('utf-8')
+            
     async def _flush_buffer(self) -> None:
         """
         Запись буфера на диск.
         """
-        if not self.buffer or not self.current_writer or not self.current_file:
+        if not self.buffer or not self.current_file:
             return
             
         try:
-            # Запись всех записей из буфера
-            for record in self.buffer:
-                self.current_writer.writerow(record)
+            # Весь буфер уже сериализован — один write()
+            self.current_file.write(self.buffer)
                 
             # Принудительная запись на диск
             self.current_file.flush()
             
-            self.records_written += len(self.buffer)
+            self.records_written += self.buffered_records
             self.buffer.clear()
+            self.buffered_records = 0
             
         except Exception as e:
             self.logger.error(f"Error flushing buffer: {e}")
@@ -327,7 +369,6 @@ class DataManager:
             if self.current_file:
                 self.current_file.close()
                 self.current_file = None
-                self.current_writer = None
                 
         except Exception as e:
             self.logger.error(f"Error closing file: {e}")
@@ -358,7 +399,7 @@ class DataManager:
             'storage_type': self.storage_type,
             'records_written': self.records_written,
             'files_created': getattr(self, 'files_created', 0),
-            'buffer_size': len(self.buffer),
+            'buffer_size': self.buffered_records,
             # Ожидаемые тестами поля
             'output_directory': str(self.output_dir),
             'compression_enabled': bool(self.compress),
@@ -5,18 +5,21 @@
 
 import asyncio
 import asyncpg
-import json
+import io
 import logging
+import orjson
+import struct
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 import os
 from contextlib import asynccontextmanager
 import ssl
+import time
 
-@dataclass
+@dataclass(slots=True)
 class OrderBookData:
-    """Структура данных orderbook для хранения в PostgreSQL"""
+    """Структура данных orderbook для хранения в PostgreSQL (slots: без __dict__ на объект)"""
     symbol: str
     timestamp: float
     event_time: int
@@ -37,12 +40,138 @@ class OrderBookData:
             'asks': self.asks
         }
 
+# Бинарный формат COPY: сигнатура + flags + длина расширения заголовка, в конце -1
+_PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_PGCOPY_TRAILER = struct.pack('>h', -1)
+_ROW_HEAD = struct.Struct('>hi')            # число полей, длина symbol
+_ROW_NUMERIC = struct.Struct('>idiqiqiq')   # timestamp, event_time, first/final update id
+_FIELD_LEN = struct.Struct('>i')
+
+
+def _encode_copy_binary(rows: List[OrderBookData], symbol_counts: Dict[str, int]) -> bytes:
+    """Кодирует строки orderbook_data_stage в бинарный поток COPY, попутно считая записи по символам"""
+    buf = bytearray(_PGCOPY_HEADER)
+    for data in rows:
+        symbol_counts[data.symbol] = symbol_counts.get(data.symbol, 0) + 1
+        symbol = data.symbol.encode('utf-8')
+        bids = orjson.dumps(data.bids)
+        asks = orjson.dumps(data.asks)
+        
+        buf += _ROW_HEAD.pack(7, len(symbol))
+        buf += symbol
+        buf += _ROW_NUMERIC.pack(
+            8, data.timestamp, 8, data.event_time,
+            8, data.first_update_id, 8, data.final_update_id
+        )
+        # JSONB в бинарном формате: байт версии 0x01 + JSON
+        buf += _FIELD_LEN.pack(len(bids) + 1)
+        buf += b'\x01'
+        buf += bids
+        buf += _FIELD_LEN.pack(len(asks) + 1)
+        buf += b'\x01'
+        buf += asks
+    buf += _PGCOPY_TRAILER
+    return bytes(buf)
+
+
 class PostgreSQLManager:
     """
     Менеджер PostgreSQL для OrderBook данных
     Поддерживает connection pooling, batch операции и мониторинг
     """
     
+    _STAGE_SQL = """
+        CREATE TEMP TABLE IF NOT EXISTS orderbook_data_stage (
+            symbol VARCHAR(20) NOT NULL,
+            timestamp DOUBLE PRECISION NOT NULL,
+            event_time BIGINT NOT NULL,
+            first_update_id BIGINT NOT NULL,
+            final_update_id BIGINT NOT NULL,
+            bids JSONB NOT NULL,
+            asks JSONB NOT NULL
+        ) ON COMMIT DELETE ROWS
+    """
+
+    _STAGE_COLUMNS = (
+        'symbol', 'timestamp', 'event_time', 'first_update_id',
+        'final_update_id', 'bids', 'asks'
+    )
+
+    _INSERT_FROM_STAGE_SQL = """
+        INSERT INTO orderbook_data (
+            symbol, timestamp, event_time, first_update_id,
+            final_update_id, bids, asks
+        )
+        SELECT symbol, timestamp, event_time, first_update_id,
+               final_update_id, bids, asks
+        FROM orderbook_data_stage
+        ON CONFLICT DO NOTHING
+    """
+
+    # TimescaleDB: orderbook_data -> hypertable по event_time (мс), чанки по 1 часу.
+    # Уникальные ключи hypertable обязаны включать колонку партиционирования, поэтому
+    # PK по id снимается, а дедупликация идет по (symbol, final_update_id, event_time).
+    # При ошибке конвертации таблица остается обычной (откат вложенного блока).
+    _HYPERTABLE_SQL = """
+        DO $$
+        BEGIN
+            -- Проверки вложены: представление timescaledb_information есть только с расширением
+            IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'timescaledb') THEN
+                IF NOT EXISTS (
+                    SELECT 1 FROM timescaledb_information.hypertables
+                    WHERE hypertable_name = 'orderbook_data'
+                ) THEN
+                    BEGIN
+                        ALTER TABLE orderbook_data DROP CONSTRAINT IF EXISTS orderbook_data_pkey;
+                        ALTER TABLE orderbook_data DROP CONSTRAINT IF EXISTS unique_symbol_update_id;
+                        ALTER TABLE orderbook_data ADD CONSTRAINT unique_symbol_update_id
+                            UNIQUE (symbol, final_update_id, event_time);
+                        
+                        PERFORM create_hypertable('orderbook_data', 'event_time',
+                            chunk_time_interval => 3600000,
+                            migrate_data => TRUE,
+                            if_not_exists => TRUE);
+                        
+                        CREATE OR REPLACE FUNCTION orderbook_data_now_ms() RETURNS BIGINT
+                            LANGUAGE SQL STABLE AS $f$ SELECT (extract(epoch FROM now()) * 1000)::BIGINT $f$;
+                        PERFORM set_integer_now_func('orderbook_data', 'orderbook_data_now_ms');
+                        
+                        ALTER TABLE orderbook_data SET (
+                            timescaledb.compress,
+                            timescaledb.compress_segmentby = 'symbol',
+                            timescaledb.compress_orderby = 'event_time DESC, final_update_id'
+                        );
+                        -- Сжимаем чанки старше суток
+                        PERFORM add_compression_policy('orderbook_data', 86400000::BIGINT, if_not_exists => TRUE);
+                        
+                        RAISE NOTICE 'orderbook_data преобразована в hypertable';
+                    EXCEPTION WHEN OTHERS THEN
+                        RAISE NOTICE 'orderbook_data остается обычной таблицей: %', SQLERRM;
+                    END;
+                END IF;
+            END IF;
+        END
+        $$;
+    """
+
+    _RECENT_DATA_SQL = """
+        SELECT symbol, timestamp, event_time, first_update_id,
+               final_update_id, bids, asks, created_at
+        FROM orderbook_data
+        WHERE symbol = $1
+        ORDER BY timestamp DESC
+        LIMIT $2
+    """
+
+    _STATS_UPSERT_SQL = """
+        INSERT INTO collection_stats (symbol, records_count, last_update)
+        SELECT s.symbol, s.cnt, NOW()
+        FROM unnest($1::text[], $2::bigint[]) AS s(symbol, cnt)
+        ON CONFLICT (symbol) DO UPDATE SET
+            records_count = collection_stats.records_count + EXCLUDED.records_count,
+            last_update = NOW()
+    """
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.pool: Optional[asyncpg.Pool] = None
@@ -50,11 +179,19 @@ class PostgreSQLManager:
         self._batch_buffer: List[OrderBookData] = []
         self._batch_size = config.get('batch_size', 100)
         self._flush_interval = config.get('flush_interval', 5)
-        self._last_flush = datetime.now()
+        # Producer кладет данные в очередь, запись в БД делает фоновая задача
+        self._queue: asyncio.Queue[Optional[OrderBookData]] = asyncio.Queue(
+            maxsize=config.get('queue_size', 10000)
+        )
+        self._writer_task: Optional[asyncio.Task] = None
+        self._hypertable = False
+        # Последний final_update_id по символу: повторы после реконнекта отсекаются до БД
+        self._seen_ids: Dict[str, int] = {}
         self._stats = {
             'total_inserts': 0,
             'batch_inserts': 0,
             'failed_inserts': 0,
+            'duplicates_skipped': 0,
             'connection_errors': 0,
             'last_insert_time': None
         }
@@ -109,10 +246,13 @@ class PostgreSQLManager:
                 'min_size': max(1, self.config.get('pool_size', 20) // 10),  # Минимум 1, максимум pool_size/10
                 'max_size': self.config.get('pool_size', 20),
                 'command_timeout': self.config.get('pool_timeout', 60),  # Увеличил таймаут
+                # Кэш prepared statements на соединение: INSERT/UPSERT парсятся один раз на backend
+                'statement_cache_size': self.config.get('statement_cache_size', 256),
                 'server_settings': {
                     'jit': 'off',  # Отключаем JIT для стабильности
                     'application_name': 'orderbook_collector'
-                }
+                },
+                'init': self._init_connection
             }
             
             # Создание pool
@@ -126,6 +266,9 @@ class PostgreSQLManager:
             # Создание схемы данных
             await self._create_schema()
             
+            # Фоновая запись batch'ей
+            self._writer_task = asyncio.create_task(self._writer_loop())
+            
             self.logger.info("🎯 PostgreSQL Manager готов к работе")
             return True
             
@@ -134,6 +277,25 @@ class PostgreSQLManager:
             self._stats['connection_errors'] += 1
             return False
     
+    @staticmethod
+    def _encode_jsonb(value: Any) -> bytes:
+        """Бинарный формат JSONB: байт версии 0x01 + JSON"""
+        return b'\x01' + orjson.dumps(value)
+
+    @staticmethod
+    def _decode_jsonb(data: bytes) -> Any:
+        return orjson.loads(data[1:])
+
+    async def _init_connection(self, conn: asyncpg.Connection):
+        """Подготовка сессии: кодек JSONB через orjson и staging-таблица для COPY"""
+        await conn.set_type_codec(
+            'jsonb', encoder=self._encode_jsonb, decoder=self._decode_jsonb,
+            schema='pg_catalog', format='binary'
+        )
+        # TEMP-таблица у каждого соединения своя, поэтому параллельные flush не мешают друг другу;
+        # ON COMMIT DELETE ROWS очищает ее в конце транзакции без отдельного TRUNCATE
+        await conn.execute(self._STAGE_SQL)
+
     async def _create_schema(self):
         """Создание таблиц и индексов для orderbook данных"""
         
@@ -154,19 +316,14 @@ class PostgreSQLManager:
             CONSTRAINT unique_symbol_update_id UNIQUE (symbol, final_update_id)
         );
         
-        -- Индексы для производительности
+        -- Индекс для выборок по символу и времени; каждый лишний btree удорожает COPY
         CREATE INDEX IF NOT EXISTS idx_orderbook_symbol_timestamp 
         ON orderbook_data (symbol, timestamp DESC);
         
-        CREATE INDEX IF NOT EXISTS idx_orderbook_timestamp 
-        ON orderbook_data (timestamp DESC);
-        
-        CREATE INDEX IF NOT EXISTS idx_orderbook_symbol_event_time 
-        ON orderbook_data (symbol, event_time DESC);
-        
-        -- Индекс для удаления старых данных
-        CREATE INDEX IF NOT EXISTS idx_orderbook_created_at 
-        ON orderbook_data (created_at);
+        -- Избыточные индексы прежних версий схемы
+        DROP INDEX IF EXISTS idx_orderbook_timestamp;
+        DROP INDEX IF EXISTS idx_orderbook_symbol_event_time;
+        DROP INDEX IF EXISTS idx_orderbook_created_at;
         
         -- Статистическая таблица для мониторинга
         CREATE TABLE IF NOT EXISTS collection_stats (
@@ -182,23 +339,38 @@ class PostgreSQLManager:
         
         async with self.pool.acquire() as conn:
             await conn.execute(schema_sql)
-            self.logger.info("✅ Схема PostgreSQL создана/обновлена")
+            await conn.execute(self._HYPERTABLE_SQL)
+            
+            if await conn.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'timescaledb')"
+            ):
+                self._hypertable = await conn.fetchval("""
+                    SELECT EXISTS (
+                        SELECT 1 FROM timescaledb_information.hypertables
+                        WHERE hypertable_name = 'orderbook_data'
+                    )
+                """)
+            
+            self.logger.info(
+                f"✅ Схема PostgreSQL создана/обновлена (hypertable: {'да' if self._hypertable else 'нет'})"
+            )
     
     async def store_orderbook(self, data: OrderBookData) -> bool:
-        """Сохранение orderbook данных (добавление в batch buffer)"""
+        """Сохранение orderbook данных (постановка в очередь фоновой записи)"""
         try:
-            # Добавляем в буфер
-            self._batch_buffer.append(data)
+            if self._writer_task is None or self._writer_task.done():
+                self.logger.error("❌ Ошибка сохранения orderbook: writer не запущен")
+                self._stats['failed_inserts'] += 1
+                return False
             
-            # Проверяем условия для flush
-            should_flush = (
-                len(self._batch_buffer) >= self._batch_size or
-                (datetime.now() - self._last_flush).seconds >= self._flush_interval
-            )
-            
-            if should_flush:
-                await self._flush_batch()
+            # update id Binance монотонны по символу: все, что не новее последнего, - повтор
+            if data.final_update_id <= self._seen_ids.get(data.symbol, -1):
+                self._stats['duplicates_skipped'] += 1
+                return True
+            self._seen_ids[data.symbol] = data.final_update_id
             
+            # При заполненной очереди producer ждет writer (backpressure)
+            await self._queue.put(data)
             return True
             
         except Exception as e:
@@ -206,6 +378,34 @@ class PostgreSQLManager:
             self._stats['failed_inserts'] += 1
             return False
     
+    async def _writer_loop(self):
+        """Фоновая запись: копит batch из очереди и сбрасывает его по размеру или интервалу"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._flush_interval
+        stopping = False
+        
+        while not stopping:
+            try:
+                item = await asyncio.wait_for(
+                    self._queue.get(), timeout=max(deadline - loop.time(), 0.001)
+                )
+            except asyncio.TimeoutError:
+                pass
+            else:
+                # Забираем все, что уже лежит в очереди, без ожидания; None - сигнал остановки
+                while True:
+                    if item is None:
+                        stopping = True
+                        break
+                    self._batch_buffer.append(item)
+                    if len(self._batch_buffer) >= self._batch_size or self._queue.empty():
+                        break
+                    item = self._queue.get_nowait()
+            
+            if stopping or len(self._batch_buffer) >= self._batch_size or loop.time() >= deadline:
+                await self._flush_batch()
+                deadline = loop.time() + self._flush_interval
+    
     async def _flush_batch(self) -> bool:
         """Массовая вставка данных из буфера в PostgreSQL"""
         if not self._batch_buffer:
@@ -215,73 +415,73 @@ class PostgreSQLManager:
             # do not drop data silently; keep in buffer for later retry
             return False
         
-        try:
-            self.logger.debug(f"📦 Flush batch: {len(self._batch_buffer)} записей")
-            
-            # Подготовка данных для batch insert
-            records = []
-            for data in self._batch_buffer:
-                records.append((
-                    data.symbol,
-                    data.timestamp,
-                    data.event_time,
-                    data.first_update_id,
-                    data.final_update_id,
-                    json.dumps(data.bids),
-                    json.dumps(data.asks)
-                ))
-            
-            # Batch INSERT с ON CONFLICT
-            insert_sql = """
-                INSERT INTO orderbook_data (
-                    symbol, timestamp, event_time, first_update_id, 
-                    final_update_id, bids, asks
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ON CONFLICT (symbol, final_update_id) DO NOTHING
-            """
-            
-            async with self.pool.acquire() as conn:
-                # Выполняем batch insert
-                await conn.executemany(insert_sql, records)
-                
-                # Обновляем статистику
-                await self._update_stats(conn, len(records))
-            
-            # Обновляем внутреннюю статистику
-            self._stats['total_inserts'] += len(records)
+        # Забираем batch целиком: writer продолжает копить новый буфер
+        batch, self._batch_buffer = self._batch_buffer, []
+        
+        self.logger.debug(f"📦 Flush batch: {len(batch)} записей")
+        
+        # Шардируем batch по символу: каждый шард пишется своим соединением из pool
+        shard_count = max(1, min(self.pool.get_max_size(), 8))
+        shards: List[List[OrderBookData]] = [[] for _ in range(shard_count)]
+        for data in batch:
+            shards[hash(data.symbol) % shard_count].append(data)
+        shards = [shard for shard in shards if shard]
+        
+        results = await asyncio.gather(
+            *(self._flush_shard(shard) for shard in shards),
+            return_exceptions=True
+        )
+        
+        inserted = 0
+        failed = 0
+        for shard, result in zip(shards, results):
+            if isinstance(result, BaseException):
+                self.logger.error(f"❌ Ошибка batch flush: {result}")
+                failed += len(shard)  # шард отброшен даже при ошибке
+            else:
+                inserted += result
+        
+        # Обновляем внутреннюю статистику
+        self._stats['failed_inserts'] += failed
+        if inserted:
+            self._stats['total_inserts'] += inserted
             self._stats['batch_inserts'] += 1
-            self._stats['last_insert_time'] = datetime.now()
-            
-            # Очищаем буфер
-            self._batch_buffer.clear()
-            self._last_flush = datetime.now()
-            
-            self.logger.debug(f"✅ Batch flush завершен: {len(records)} записей")
-            return True
+            self._stats['last_insert_time'] = time.time()
+        
+        self.logger.debug(f"✅ Batch flush завершен: {inserted} записей, {len(shards)} шардов")
+        return failed == 0
+    
+    async def _flush_shard(self, shard: List[OrderBookData]) -> int:
+        """COPY одного шарда batch'а на отдельном соединении"""
+        # Готовый бинарный поток COPY и подсчет записей по символам за один проход
+        symbol_counts: Dict[str, int] = {}
+        payload = _encode_copy_binary(shard, symbol_counts)
+        
+        async with self.pool.acquire() as conn:
+            # COPY в staging-таблицу и перенос с ON CONFLICT одной транзакцией
+            async with conn.transaction():
+                await conn.copy_to_table(
+                    'orderbook_data_stage',
+                    source=io.BytesIO(payload),
+                    columns=self._STAGE_COLUMNS,
+                    format='binary'
+                )
+                # fetch идет через extended protocol и кэш statements (execute без
+                # аргументов уходит simple query и парсится сервером каждый раз)
+                await conn.fetch(self._INSERT_FROM_STAGE_SQL)
             
-        except Exception as e:
-            self.logger.error(f"❌ Ошибка batch flush: {e}")
-            self._stats['failed_inserts'] += len(self._batch_buffer)
-            self._batch_buffer.clear()  # Очищаем буфер даже при ошибке
-            return False
+            # Обновляем статистику
+            await self._update_stats(conn, symbol_counts)
+        
+        return len(shard)
     
-    async def _update_stats(self, conn: asyncpg.Connection, records_count: int):
+    async def _update_stats(self, conn: asyncpg.Connection, symbol_counts: Dict[str, int]):
         """Обновление статистики в базе данных"""
         try:
-            # Группируем записи по символам
-            symbol_counts = {}
-            for data in self._batch_buffer[-records_count:]:
-                symbol_counts[data.symbol] = symbol_counts.get(data.symbol, 0) + 1
-            
-            # Обновляем статистику для каждого символа
-            for symbol, count in symbol_counts.items():
-                await conn.execute("""
-                    INSERT INTO collection_stats (symbol, records_count, last_update)
-                    VALUES ($1, $2, NOW())
-                    ON CONFLICT (symbol) DO UPDATE SET
-                        records_count = collection_stats.records_count + $2,
-                        last_update = NOW()
-                """, symbol, count)
+            # Один UPSERT на все символы через unnest массивов
+            await conn.execute(
+                self._STATS_UPSERT_SQL, list(symbol_counts), list(symbol_counts.values())
+            )
             
         except Exception as e:
             self.logger.error(f"⚠️ Ошибка обновления статистики: {e}")
@@ -292,27 +492,26 @@ class PostgreSQLManager:
             stats = self._stats.copy()
             
             if self.pool:
-                async with self.pool.acquire() as conn:
-                    # Общая статистика
-                    total_records = await conn.fetchval(
-                        "SELECT SUM(records_count) FROM collection_stats"
-                    ) or 0
-                    
-                    # Статистика по символам
-                    symbol_stats = await conn.fetch("""
+                # Общая статистика и статистика по символам - параллельно на двух соединениях
+                total_records, symbol_stats = await asyncio.gather(
+                    self.pool.fetchval("SELECT SUM(records_count) FROM collection_stats"),
+                    self.pool.fetch("""
                         SELECT symbol, records_count, last_update,
                                avg_records_per_minute
                         FROM collection_stats
                         ORDER BY records_count DESC
-                    """)
-                    
-                    stats.update({
-                        'total_records_in_db': total_records,
-                        'symbols_stats': [dict(row) for row in symbol_stats],
-                        'buffer_size': len(self._batch_buffer),
-                        'pool_size': self.pool.get_size(),
-                        'pool_idle': self.pool.get_idle_size()
-                    })
+                        LIMIT $1
+                    """, self.config.get('stats_symbols_limit', 500))
+                )
+                
+                stats.update({
+                    'total_records_in_db': total_records or 0,
+                    'symbols_stats': [dict(row) for row in symbol_stats],
+                    'buffer_size': len(self._batch_buffer),
+                    'queue_size': self._queue.qsize(),
+                    'pool_size': self.pool.get_size(),
+                    'pool_idle': self.pool.get_idle_size()
+                })
             
             return stats
             
@@ -320,44 +519,50 @@ class PostgreSQLManager:
             self.logger.error(f"❌ Ошибка получения статистики: {e}")
             return self._stats.copy()
     
+    async def _fetch_recent(self, symbol: str, limit: int) -> List[asyncpg.Record]:
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(self._RECENT_DATA_SQL, symbol, limit)
+    
     async def get_recent_data(self, symbol: str, limit: int = 100) -> List[Dict[str, Any]]:
         """Получение последних данных orderbook для символа"""
         try:
-            async with self.pool.acquire() as conn:
-                records = await conn.fetch("""
-                    SELECT symbol, timestamp, event_time, first_update_id,
-                           final_update_id, bids, asks, created_at
-                    FROM orderbook_data
-                    WHERE symbol = $1
-                    ORDER BY timestamp DESC
-                    LIMIT $2
-                """, symbol, limit)
-                
-                return [
-                    {
-                        'symbol': row['symbol'],
-                        'timestamp': row['timestamp'],
-                        'event_time': row['event_time'],
-                        'first_update_id': row['first_update_id'],
-                        'final_update_id': row['final_update_id'],
-                        'bids': json.loads(row['bids']),
-                        'asks': json.loads(row['asks']),
-                        'created_at': row['created_at'].isoformat()
-                    }
-                    for row in records
-                ]
+            # bids/asks уже декодированы кодеком JSONB, Record -> dict без поштучной сборки
+            rows = [dict(row) for row in await self._fetch_recent(symbol, limit)]
+            for row in rows:
+                row['created_at'] = row['created_at'].isoformat()
+            return rows
                 
         except Exception as e:
             self.logger.error(f"❌ Ошибка получения данных для {symbol}: {e}")
             return []
     
+    async def get_recent_data_json(self, symbol: str, limit: int = 100) -> bytes:
+        """Последние данные orderbook для символа сразу в JSON (bytes) для отдачи по HTTP"""
+        try:
+            # orjson сериализует datetime сам, без isoformat() на каждую строку
+            return orjson.dumps([dict(row) for row in await self._fetch_recent(symbol, limit)])
+                
+        except Exception as e:
+            self.logger.error(f"❌ Ошибка получения данных для {symbol}: {e}")
+            return b'[]'
+    
     async def cleanup_old_data(self, retention_days: int = 30) -> int:
         """Очистка старых данных"""
         try:
             async with self.pool.acquire() as conn:
+                if self._hypertable:
+                    # Retention на hypertable - удаление целых чанков вместо DELETE по строкам
+                    cutoff_ms = int((time.time() - retention_days * 86400) * 1000)
+                    chunks = await conn.fetch(
+                        "SELECT drop_chunks('orderbook_data', older_than => $1::BIGINT)", cutoff_ms
+                    )
+                    self.logger.info(f"🧹 Удалено {len(chunks)} чанков orderbook_data (>{retention_days} дней)")
+                    return len(chunks)
+                
+                # Плейсхолдер внутри строкового литерала не связывается, интервал строим на сервере
                 result = await conn.execute("""
                     DELETE FROM orderbook_data
-                    WHERE created_at < NOW() - INTERVAL '%s days'
+                    WHERE created_at < NOW() - make_interval(days => $1)
                 """, retention_days)
                 
                 deleted_count = int(result.split()[-1])
@@ -398,15 +603,28 @@ class PostgreSQLManager:
         return health
     
     async def force_flush(self) -> bool:
-        """Принудительная запись буфера в базу"""
+        """Принудительная запись буфера и очереди в базу"""
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is None:
+                # Сигнал остановки оставляем writer'у
+                self._queue.put_nowait(None)
+                break
+            self._batch_buffer.append(item)
         return await self._flush_batch()
     
     async def close(self):
         """Закрытие соединений и финальный flush"""
         try:
-            # Финальный flush данных
-            if self._batch_buffer:
-                await self._flush_batch()
+            # Останавливаем writer: он дописывает очередь и делает финальный flush
+            writer, self._writer_task = self._writer_task, None
+            if writer is not None and not writer.done():
+                await self._queue.put(None)
+                await writer
+            
+            # Финальный flush данных, если writer так и не был запущен
+            if self._batch_buffer or not self._queue.empty():
+                await self.force_flush()
             
             # Закрытие pool
             if self.pool:
@@ -426,12 +644,14 @@ class PostgreSQLManager:
 # Utility functions
 def create_orderbook_data(symbol: str, raw_data: Dict[str, Any]) -> OrderBookData:
     """Создание OrderBookData из сырых данных Binance"""
+    # Приводим типы один раз здесь: binary COPY ждет int для BIGINT и float для DOUBLE
+    event_time = int(raw_data.get('E', 0))
     return OrderBookData(
         symbol=symbol,
-        timestamp=raw_data.get('E', 0) / 1000.0,  # Event time в секундах
-        event_time=raw_data.get('E', 0),
-        first_update_id=raw_data.get('U', 0),
-        final_update_id=raw_data.get('u', 0),
+        timestamp=event_time / 1000.0,  # Event time в секундах
+        event_time=event_time,
+        first_update_id=int(raw_data.get('U', 0)),
+        final_update_id=int(raw_data.get('u', 0)),
         bids=raw_data.get('b', []),
         asks=raw_data.get('a', [])
     )
@@ -1,79 +1,116 @@
 #!/usr/bin/env python3
 """
 Быстрый probe для проверки, что данные реально пишутся в PostgreSQL.
-Читает DATABASE_URL из env или принимает через --db.
-Выводит:
-- последние ts_exchange по основным таблицам,
-- количество записей за последние 5/60 минут,
-- топ-символы по book_ticker за 60 минут,
-- строку из marketdata.ingestion_stats (если view доступен).
+Читает PROBE_DATABASE_URL / DATABASE_URL из env или принимает через --db.
+PROBE_DATABASE_URL позволяет направить probe через PgBouncer (transaction pooling,
+обычно :6432): кэш prepared statements отключен, поэтому такой режим безопасен.
+Коллектор держит долгие сессии и подключается к PostgreSQL напрямую.
+Выводит одной строкой JSON-отчет:
+- last_ts: последние ts_exchange по основным таблицам,
+- counts: количество записей за последние 5/60 минут,
+- top_symbols: топ-символы по book_ticker за 60 минут,
+- ingestion_stats: строки из marketdata.ingestion_stats (или ingestion_stats_error, если view недоступен).
 """
 import os
+import sys
 import asyncio
 import argparse
 import asyncpg
-from datetime import timedelta
+import orjson
+from datetime import datetime, timedelta, timezone
 
 DEFAULT_LAST_MIN = 5
 DEFAULT_LAST_MIN_LONG = 60
 
+# Короткие запросы к большим гипертаблицам не должны платить за JIT-компиляцию.
+# Через PgBouncer: ignore_startup_parameters = jit (тогда действует серверный default)
+PROBE_SERVER_SETTINGS = {'jit': 'off', 'application_name': 'db_probe'}
+
+LAST_TS_COLUMNS = ("book_ticker", "trades", "depth_events", "orderbook_top5")
+COUNT_COLUMNS = (
+    "book_ticker_5m", "trades_5m", "depth_events_5m",
+    "book_ticker_60m", "trades_60m", "depth_events_60m",
+)
+
 SQL_QUERIES = {
-    "last_ts": {
-        "book_ticker": "SELECT MAX(ts_exchange) AS max_ts FROM marketdata.book_ticker;",
-        "trades": "SELECT MAX(ts_exchange) AS max_ts FROM marketdata.trades;",
-        "depth_events": "SELECT MAX(ts_exchange) AS max_ts FROM marketdata.depth_events;",
-        "orderbook_top5": "SELECT MAX(ts_exchange) AS max_ts FROM marketdata.orderbook_top5;"
-    },
-    "counts_recent": {
-        "book_ticker_5m": "SELECT COUNT(*) FROM marketdata.book_ticker WHERE ts_exchange >= NOW() - INTERVAL '5 minutes';",
-        "trades_5m": "SELECT COUNT(*) FROM marketdata.trades WHERE ts_exchange >= NOW() - INTERVAL '5 minutes';",
-        "depth_events_5m": "SELECT COUNT(*) FROM marketdata.depth_events WHERE ts_exchange >= NOW() - INTERVAL '5 minutes';",
-        "book_ticker_60m": "SELECT COUNT(*) FROM marketdata.book_ticker WHERE ts_exchange >= NOW() - INTERVAL '60 minutes';",
-        "trades_60m": "SELECT COUNT(*) FROM marketdata.trades WHERE ts_exchange >= NOW() - INTERVAL '60 minutes';",
-        "depth_events_60m": "SELECT COUNT(*) FROM marketdata.depth_events WHERE ts_exchange >= NOW() - INTERVAL '60 minutes';"
-    },
+    # Последние ts и счетчики за окна - одной строкой за один round-trip.
+    # Границы окон передаются параметрами ($1 = 5m, $2 = 60m), а не NOW() - INTERVAL
+    "summary": """
+        WITH last_ts AS (
+            SELECT
+                (SELECT MAX(ts_exchange) FROM marketdata.book_ticker) AS book_ticker,
+                (SELECT MAX(ts_exchange) FROM marketdata.trades) AS trades,
+                (SELECT MAX(ts_exchange) FROM marketdata.depth_events) AS depth_events,
+                (SELECT MAX(ts_exchange) FROM marketdata.orderbook_top5) AS orderbook_top5
+        ),
+        counts AS (
+            SELECT
+                (SELECT COUNT(*) FROM marketdata.book_ticker WHERE ts_exchange >= $1) AS book_ticker_5m,
+                (SELECT COUNT(*) FROM marketdata.trades WHERE ts_exchange >= $1) AS trades_5m,
+                (SELECT COUNT(*) FROM marketdata.depth_events WHERE ts_exchange >= $1) AS depth_events_5m,
+                (SELECT COUNT(*) FROM marketdata.book_ticker WHERE ts_exchange >= $2) AS book_ticker_60m,
+                (SELECT COUNT(*) FROM marketdata.trades WHERE ts_exchange >= $2) AS trades_60m,
+                (SELECT COUNT(*) FROM marketdata.depth_events WHERE ts_exchange >= $2) AS depth_events_60m
+        )
+        SELECT * FROM last_ts, counts;
+    """,
     "top_symbols": {
+        # Сначала агрегат по symbol_id на одной book_ticker, join со справочником - только для топ-10
         "book_ticker_top": (
-            "SELECT s.symbol, COUNT(*) AS cnt "
-            "FROM marketdata.book_ticker bt JOIN marketdata.symbols s ON s.id = bt.symbol_id "
-            "WHERE bt.ts_exchange >= NOW() - INTERVAL '60 minutes' "
-            "GROUP BY s.symbol ORDER BY cnt DESC LIMIT 10;"
+            "WITH agg AS ("
+            " SELECT symbol_id, COUNT(*) AS cnt FROM marketdata.book_ticker"
+            " WHERE ts_exchange >= $1"
+            " GROUP BY symbol_id ORDER BY cnt DESC LIMIT 10"
+            ") "
+            "SELECT s.symbol, a.cnt "
+            "FROM agg a JOIN marketdata.symbols s ON s.id = a.symbol_id "
+            "ORDER BY a.cnt DESC;"
         )
     },
     "ingestion_stats": "SELECT * FROM marketdata.ingestion_stats ORDER BY book_ticker_count_1h DESC LIMIT 10;"
 }
 
 async def run_probe(db_url: str):
-    conn = await asyncpg.connect(db_url)
+    # Независимые запросы идут параллельно: по соединению из pool на каждый
+    pool = await asyncpg.create_pool(db_url, min_size=3, max_size=3, statement_cache_size=0,
+                                     server_settings=PROBE_SERVER_SETTINGS)
     try:
-        print("== Last timestamps ==")
-        for name, sql in SQL_QUERIES["last_ts"].items():
-            row = await conn.fetchrow(sql)
-            print(f"{name:16s}: {row['max_ts']}")
-        
-        print("\n== Counts recent (5m / 60m) ==")
-        for name, sql in SQL_QUERIES["counts_recent"].items():
-            row = await conn.fetchrow(sql)
-            print(f"{name:16s}: {row['count']}")
+        # Границы окон считаем один раз и передаем как timestamptz-параметры
+        now = datetime.now(timezone.utc)
+        cutoff_short = now - timedelta(minutes=DEFAULT_LAST_MIN)
+        cutoff_long = now - timedelta(minutes=DEFAULT_LAST_MIN_LONG)
         
-        print("\n== Top symbols by book_ticker (60m) ==")
-        rows = await conn.fetch(SQL_QUERIES["top_symbols"]["book_ticker_top"])
-        for r in rows:
-            print(f"{r['symbol']:12s} {r['cnt']}")
+        summary, top_rows, stats_rows = await asyncio.gather(
+            pool.fetchrow(SQL_QUERIES["summary"], cutoff_short, cutoff_long),
+            pool.fetch(SQL_QUERIES["top_symbols"]["book_ticker_top"], cutoff_long),
+            pool.fetch(SQL_QUERIES["ingestion_stats"]),
+            return_exceptions=True
+        )
+        # Основные запросы обязательны; view ingestion_stats может отсутствовать
+        for result in (summary, top_rows):
+            if isinstance(result, BaseException):
+                raise result
         
-        print("\n== Ingestion stats (view) ==")
-        try:
-            rows = await conn.fetch(SQL_QUERIES["ingestion_stats"]) 
-            for r in rows:
-                print(dict(r))
-        except Exception as e:
-            print(f"ingestion_stats not available: {e}")
+        # Отчет собирается целиком и пишется одним write (orjson сериализует datetime сам)
+        report = {
+            "last_ts": {name: summary[name] for name in LAST_TS_COLUMNS},
+            "counts": {name: summary[name] for name in COUNT_COLUMNS},
+            "top_symbols": [{"symbol": r['symbol'], "cnt": r['cnt']} for r in top_rows],
+        }
+        if isinstance(stats_rows, BaseException):
+            report["ingestion_stats_error"] = str(stats_rows)
+        else:
+            report["ingestion_stats"] = [dict(r) for r in stats_rows]
+        # default=str - для Decimal/interval из view
+        sys.stdout.buffer.write(orjson.dumps(report, default=str) + b"\n")
+        sys.stdout.flush()
     finally:
-        await conn.close()
+        await pool.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument('--db', dest='db', default=os.getenv('DATABASE_URL'), help='Database URL (postgres:// or postgresql://)')
+    parser.add_argument('--db', dest='db', default=os.getenv('PROBE_DATABASE_URL') or os.getenv('DATABASE_URL'),
+                        help='Database URL (postgres:// or postgresql://)')
     args = parser.parse_args()
     if not args.db:
         print("DATABASE_URL not provided. Use --db=... or set env var.")
@@ -7,6 +7,8 @@
 
 Требования:
   - DATABASE_URL в окружении (postgresql://...)
+  - PROBE_DATABASE_URL (опционально) имеет приоритет, например адрес PgBouncer
+    в режиме transaction pooling: кэш prepared statements отключен
 
 Результат:
   - Печатает JSON-словарь по каждому символу: last_bt, bt_5m, bt_60m, tr_5m, tr_60m
@@ -17,42 +19,53 @@ import sys
 import json
 import argparse
 import asyncio
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any
 import asyncpg
 
 
 async def probe_symbols(db_url: str, symbols: List[str], minutes: int) -> Dict[str, Any]:
-    conn = await asyncpg.connect(db_url)
+    # jit off: короткие счетчики не должны платить за JIT-компиляцию
+    # (через PgBouncer нужен ignore_startup_parameters = jit)
+    conn = await asyncpg.connect(db_url, statement_cache_size=0,
+                                 server_settings={'jit': 'off', 'application_name': 'symbol_probe'})
     try:
-        out: Dict[str, Any] = {}
-        for s in symbols:
-            row = await conn.fetchrow(
-                f"""
-                SELECT 
-                  s.symbol,
-                  MAX(bt.ts_exchange) AS last_bt,
-                  COUNT(*) FILTER (WHERE bt.ts_exchange >= NOW() - INTERVAL '{minutes} minutes') AS bt_5m,
-                  COUNT(*) FILTER (WHERE bt.ts_exchange >= NOW() - INTERVAL '60 minutes') AS bt_60m,
-                  COUNT(tr.*) FILTER (WHERE tr.ts_exchange >= NOW() - INTERVAL '{minutes} minutes') AS tr_5m,
-                  COUNT(tr.*) FILTER (WHERE tr.ts_exchange >= NOW() - INTERVAL '60 minutes') AS tr_60m
-                FROM marketdata.symbols s
-                LEFT JOIN marketdata.book_ticker bt ON bt.symbol_id = s.id
-                LEFT JOIN marketdata.trades tr ON tr.symbol_id = s.id
-                WHERE s.symbol = $1
-                GROUP BY s.symbol
-                """,
-                s,
-            )
-            if row:
-                out[s] = {
-                    'last_bt': row['last_bt'].isoformat() if row['last_bt'] else None,
-                    'bt_5m': int(row['bt_5m'] or 0),
-                    'bt_60m': int(row['bt_60m'] or 0),
-                    'tr_5m': int(row['tr_5m'] or 0),
-                    'tr_60m': int(row['tr_60m'] or 0),
-                }
-            else:
-                out[s] = None
+        # Границы окон - параметры запроса: текст SQL не зависит от --minutes.
+        # Каждый счетчик - узкий range scan по индексу (symbol_id, ts_exchange)
+        now = datetime.now(timezone.utc)
+        cutoff_recent = now - timedelta(minutes=minutes)
+        cutoff_60m = now - timedelta(minutes=60)
+        # Все символы одним запросом: один round-trip и один план на весь список
+        rows = await conn.fetch(
+            """
+            SELECT
+              s.symbol,
+              (SELECT MAX(ts_exchange) FROM marketdata.book_ticker
+                WHERE symbol_id = s.id) AS last_bt,
+              (SELECT COUNT(*) FROM marketdata.book_ticker
+                WHERE symbol_id = s.id AND ts_exchange >= $2) AS bt_5m,
+              (SELECT COUNT(*) FROM marketdata.book_ticker
+                WHERE symbol_id = s.id AND ts_exchange >= $3) AS bt_60m,
+              (SELECT COUNT(*) FROM marketdata.trades
+                WHERE symbol_id = s.id AND ts_exchange >= $2) AS tr_5m,
+              (SELECT COUNT(*) FROM marketdata.trades
+                WHERE symbol_id = s.id AND ts_exchange >= $3) AS tr_60m
+            FROM marketdata.symbols s
+            WHERE s.symbol = ANY($1::text[])
+            """,
+            symbols, cutoff_recent, cutoff_60m,
+        )
+        out: Dict[str, Any] = {s: None for s in symbols}
+        for row in rows:
+            if out.get(row['symbol']) is not None:
+                continue
+            out[row['symbol']] = {
+                'last_bt': row['last_bt'].isoformat() if row['last_bt'] else None,
+                'bt_5m': int(row['bt_5m'] or 0),
+                'bt_60m': int(row['bt_60m'] or 0),
+                'tr_5m': int(row['tr_5m'] or 0),
+                'tr_60m': int(row['tr_60m'] or 0),
+            }
         return out
     finally:
         await conn.close()
@@ -64,7 +77,7 @@ def main():
     parser.add_argument('--minutes', type=int, default=5, help='Window for recent checks (default: 5)')
     args = parser.parse_args()
 
-    db_url = os.getenv('DATABASE_URL')
+    db_url = os.getenv('PROBE_DATABASE_URL') or os.getenv('DATABASE_URL')
     if not db_url:
         print(json.dumps({'error': 'DATABASE_URL is not set'}))
         sys.exit(2)
@@ -4,11 +4,19 @@ CLI-проверка полноты и свежести инжеста данн
 
 Критерии по умолчанию (изменяемые флагами/ENV):
 - Свежесть: MAX(ts_exchange) не старше N секунд для каждой таблицы.
-- Объём: COUNT(*) за последнюю минуту >= минимального порога.
+- Объём: записей за последнюю минуту >= минимального порога (скан останавливается на пороге).
+
+Свежесть можно проверять без чтения таблиц (--freshness-source pg_stat): прирост
+pg_stat_all_tables.n_tup_ins (по таблице и ее чанкам) между двумя снимками.
+MAX(ts_exchange) тогда запрашивается только для таблиц без статистики.
 
 Выход:
 - Код 0, если все проверки пройдены; 1 — если есть нарушения.
 - Печатает JSON-отчёт (pass/fail + метрики и причины отказа).
+
+Подключение: PROBE_DATABASE_URL (если задан) имеет приоритет над DATABASE_URL —
+например, адрес PgBouncer в режиме transaction pooling. Кэш prepared statements
+отключен, поэтому такой режим безопасен; коллектор подключается напрямую.
 """
 
 import os
@@ -16,6 +24,8 @@ import sys
 import json
 import asyncio
 import argparse
+import functools
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any
 
 import asyncpg
@@ -25,7 +35,8 @@ from urllib.parse import urlparse
 
 def parse_args():
     p = argparse.ArgumentParser(description='Verify ingestion freshness and volume in PostgreSQL')
-    p.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help='PostgreSQL URL (env: DATABASE_URL)')
+    p.add_argument('--database-url', default=os.getenv('PROBE_DATABASE_URL') or os.getenv('DATABASE_URL'),
+                   help='PostgreSQL URL (env: PROBE_DATABASE_URL, DATABASE_URL)')
     p.add_argument('--freshness-seconds', type=int, default=int(os.getenv('VERIFY_FRESHNESS_SEC', '60')),
                    help='Максимально допустимый лаг свежести (секунды)')
     p.add_argument('--min-bt-per-minute', type=int, default=int(os.getenv('VERIFY_MIN_BT_1M', '10')),
@@ -34,16 +45,17 @@ def parse_args():
                    help='Минимум записей trades за 1 минуту')
     p.add_argument('--min-de-per-minute', type=int, default=int(os.getenv('VERIFY_MIN_DE_1M', '10')),
                    help='Минимум записей depth_events за 1 минуту')
+    p.add_argument('--freshness-source', choices=('max', 'pg_stat'),
+                   default=os.getenv('VERIFY_FRESHNESS_SOURCE', 'max'),
+                   help='Источник свежести: MAX(ts_exchange) или прирост n_tup_ins в pg_stat_all_tables')
+    p.add_argument('--flow-sample-seconds', type=float, default=float(os.getenv('VERIFY_FLOW_SAMPLE_SEC', '2')),
+                   help='Интервал между снимками n_tup_ins для --freshness-source pg_stat')
     p.add_argument('--depth-required', action='store_true',
                    help='Требовать наличие свежих depth_events (например, если ENABLE_DEPTH=true в проде)')
     return p.parse_args()
 
 
-async def query_row(conn: asyncpg.Connection, sql: str) -> Any:
-    return await conn.fetchval(sql)
-
-
-async def verify_indexes(conn: asyncpg.Connection) -> Dict[str, Any]:
+async def verify_indexes(pool: asyncpg.Pool) -> Dict[str, Any]:
     """Проверка наличия уникальности для depth_events по (symbol_id, ts_exchange, final_update_id)."""
     res: Dict[str, Any] = {"ok": True, "details": []}
     sql_idx = """
@@ -53,13 +65,62 @@ async def verify_indexes(conn: asyncpg.Connection) -> Dict[str, Any]:
           AND tablename = 'depth_events'
           AND indexname = 'uq_depth_events_symbol_time_final'
     """
-    has_unique = await conn.fetchval(sql_idx)
+    has_unique = await pool.fetchval(sql_idx)
     if not has_unique:
         res["ok"] = False
         res["details"].append("Unique index uq_depth_events_symbol_time_final отсутствует")
     return res
 
 
+TABLES = {'bt': 'book_ticker', 'tr': 'trades', 'de': 'depth_events'}
+
+LAST_SECONDS_SQL = "SELECT EXTRACT(EPOCH FROM (NOW() - MAX(ts_exchange)))::int FROM marketdata.{table}"
+
+# Счетчики вставок из статистики: для гипертаблиц строки пишутся в чанки
+# (наследники в pg_inherits), поэтому суммируем таблицу вместе с ними
+INSERT_COUNTERS_SQL = """
+    SELECT t.key,
+           (SELECT SUM(s.n_tup_ins)
+              FROM pg_stat_all_tables s
+             WHERE s.relid = t.rel
+                OR s.relid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = t.rel))::bigint AS n_tup_ins
+    FROM (VALUES ('bt', 'marketdata.book_ticker'::regclass),
+                 ('tr', 'marketdata.trades'::regclass),
+                 ('de', 'marketdata.depth_events'::regclass)) AS t(key, rel)
+"""
+
+
+async def sample_insert_flow(pool: asyncpg.Pool, interval: float) -> Dict[str, Any]:
+    """Прирост n_tup_ins за interval секунд по таблицам (None, если статистики нет)."""
+    before = {r['key']: r['n_tup_ins'] for r in await pool.fetch(INSERT_COUNTERS_SQL)}
+    await asyncio.sleep(interval)
+    after = {r['key']: r['n_tup_ins'] for r in await pool.fetch(INSERT_COUNTERS_SQL)}
+    return {
+        key: (after[key] - before[key]) if after.get(key) is not None and before.get(key) is not None else None
+        for key in TABLES
+    }
+
+
+@functools.lru_cache(maxsize=4)
+def _ssl_context(sslmode: str, cafile: str | None, cafile_mtime: float | None) -> ssl.SSLContext | bool:
+    """Build (once per sslmode/CA file version) an SSL context for asyncpg.
+
+    cafile_mtime is part of the cache key only, so a rotated CA bundle is re-read.
+    """
+    if sslmode in ('disable', 'allow', 'prefer'):
+        return False
+    if sslmode in ('verify-full', 'verify-ca'):
+        ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH, cafile=cafile)
+        ctx.check_hostname = True
+        ctx.verify_mode = ssl.CERT_REQUIRED
+        return ctx
+    # require / verify-none and unknown values: encryption without verification
+    ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+
 def _ssl_from_dsn(dsn: str) -> ssl.SSLContext | bool | None:
     """Create an SSL context for asyncpg based on sslmode in DSN query.
 
@@ -75,27 +136,13 @@ def _ssl_from_dsn(dsn: str) -> ssl.SSLContext | bool | None:
                 k, _, v = part.partition('=')
                 query[k] = v
         sslmode = (query.get('sslmode') or os.getenv('DB_SSLMODE') or 'require').lower()
-        if sslmode in ('disable', 'allow', 'prefer'):
-            return False
-        if sslmode in ('require', 'verify-none'):
-            ctx = ssl.create_default_context()
-            ctx.check_hostname = False
-            ctx.verify_mode = ssl.CERT_NONE
-            return ctx
-        if sslmode in ('verify-full', 'verify-ca'):
-            cafile = os.getenv('DB_SSLROOTCERT')
-            if cafile and os.path.exists(cafile):
-                ctx = ssl.create_default_context(cafile=cafile)
-            else:
-                ctx = ssl.create_default_context()
-            ctx.check_hostname = True
-            ctx.verify_mode = ssl.CERT_REQUIRED
-            return ctx
-        # Fallback to require semantics
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        return ctx
+        cafile = os.getenv('DB_SSLROOTCERT')
+        cafile_mtime = None
+        if sslmode in ('verify-full', 'verify-ca') and cafile and os.path.exists(cafile):
+            cafile_mtime = os.path.getmtime(cafile)
+        else:
+            cafile = None
+        return _ssl_context(sslmode, cafile, cafile_mtime)
     except Exception:
         return None
 
@@ -107,48 +154,92 @@ async def main_async():
         return 1
 
     report: Dict[str, Any] = {"ok": True, "checks": {}}
-    conn: asyncpg.Connection
+    pool: asyncpg.Pool
     try:
         ssl_ctx = _ssl_from_dsn(args.database_url)
-        conn = await asyncpg.connect(args.database_url, command_timeout=10, ssl=ssl_ctx)
+        # Метрики, проверка индексов и (для pg_stat) снимки счетчиков идут параллельно
+        pool = await asyncpg.create_pool(
+            args.database_url, min_size=3, max_size=3,
+            command_timeout=10, ssl=ssl_ctx, statement_cache_size=0,
+            # jit off: пороговые счетчики не должны платить за JIT-компиляцию
+            # (через PgBouncer нужен ignore_startup_parameters = jit)
+            server_settings={'jit': 'off', 'application_name': 'verify_ingestion'}
+        )
     except Exception as e:
         print(json.dumps({"ok": False, "error": f"DB connect failed: {e}"}))
         return 1
 
     try:
-        # Метрики
-        metrics_sql = {
-            'bt_last': "SELECT EXTRACT(EPOCH FROM (NOW() - MAX(ts_exchange)))::int FROM marketdata.book_ticker",
-            'tr_last': "SELECT EXTRACT(EPOCH FROM (NOW() - MAX(ts_exchange)))::int FROM marketdata.trades",
-            'de_last': "SELECT EXTRACT(EPOCH FROM (NOW() - MAX(ts_exchange)))::int FROM marketdata.depth_events",
-            'bt_1m': "SELECT COUNT(*) FROM marketdata.book_ticker WHERE ts_exchange >= NOW() - INTERVAL '1 minute'",
-            'tr_1m': "SELECT COUNT(*) FROM marketdata.trades WHERE ts_exchange >= NOW() - INTERVAL '1 minute'",
-            'de_1m': "SELECT COUNT(*) FROM marketdata.depth_events WHERE ts_exchange >= NOW() - INTERVAL '1 minute'",
-        }
+        # Все метрики - одним запросом (скалярные подзапросы), проверка индексов - параллельно
+        # на втором соединении пула. Граница минутного окна - $1, пороги объема - $2..$4
+        # В режиме pg_stat MAX(ts_exchange) не читаем: свежесть дает прирост n_tup_ins
+        use_pg_stat = args.freshness_source == 'pg_stat'
+        last_cols = ",\n".join(
+            f"              {'NULL::int' if use_pg_stat else '(' + LAST_SECONDS_SQL.format(table=table) + ')'} AS {key}_last"
+            for key, table in TABLES.items()
+        )
+        cutoff_1m = datetime.now(timezone.utc) - timedelta(minutes=1)
+        metrics_sql = f"""
+            SELECT
+{last_cols},
+              -- Нужен только факт "не меньше порога": LIMIT останавливает скан на пороге,
+              -- поэтому count_1m в отчете ограничен сверху порогом
+              (SELECT COUNT(*) FROM (SELECT 1 FROM marketdata.book_ticker
+                                     WHERE ts_exchange >= $1 LIMIT $2) t) AS bt_1m,
+              (SELECT COUNT(*) FROM (SELECT 1 FROM marketdata.trades
+                                     WHERE ts_exchange >= $1 LIMIT $3) t) AS tr_1m,
+              (SELECT COUNT(*) FROM (SELECT 1 FROM marketdata.depth_events
+                                     WHERE ts_exchange >= $1 LIMIT $4) t) AS de_1m
+        """
 
         # Сбор
-        data = {}
-        for k, sql in metrics_sql.items():
-            try:
-                data[k] = await query_row(conn, sql)
-            except Exception as e:
-                data[k] = None
-                report["ok"] = False
-                report.setdefault("errors", []).append(f"Query {k} failed: {e}")
+        tasks = [
+            pool.fetchrow(metrics_sql, cutoff_1m, args.min_bt_per_minute,
+                          args.min_tr_per_minute, args.min_de_per_minute),
+            verify_indexes(pool),
+        ]
+        if use_pg_stat:
+            tasks.append(sample_insert_flow(pool, args.flow_sample_seconds))
+        row, idx, *flow = await asyncio.gather(*tasks, return_exceptions=True)
+        if isinstance(row, BaseException):
+            data = {}
+            report["ok"] = False
+            report.setdefault("errors", []).append(f"Metrics query failed: {row}")
+        else:
+            data = dict(row)
 
         # Индексы depth_events
-        idx = await verify_indexes(conn)
+        if isinstance(idx, BaseException):
+            idx = {"ok": False, "details": [f"Index check failed: {idx}"]}
         report["checks"]["indexes"] = idx
         if not idx["ok"]:
             report["ok"] = False
 
+        # Свежесть по статистике вставок; без статистики - fallback на MAX(ts_exchange)
+        inserts: Dict[str, Any] = {}
+        if use_pg_stat:
+            inserts = {} if isinstance(flow[0], BaseException) else flow[0]
+            for key, table in TABLES.items():
+                if key == 'de' and not args.depth_required:
+                    continue
+                if inserts.get(key) is None:
+                    try:
+                        data[f'{key}_last'] = await pool.fetchval(LAST_SECONDS_SQL.format(table=table))
+                    except Exception as e:
+                        report.setdefault("errors", []).append(f"Query {key}_last failed: {e}")
+
+        def fresh_ok(key: str) -> bool:
+            if inserts.get(key) is not None:
+                return inserts[key] > 0
+            return (data.get(f'{key}_last') is not None) and (data[f'{key}_last'] <= args.freshness_seconds)
+
         # Правила
-        freshness = args.freshness_seconds
         # book_ticker
-        bt_fresh_ok = (data.get('bt_last') is not None) and (data['bt_last'] <= freshness)
+        bt_fresh_ok = fresh_ok('bt')
         bt_rate_ok = (data.get('bt_1m') or 0) >= args.min_bt_per_minute
         report["checks"]["book_ticker"] = {
             "fresh_seconds": data.get('bt_last'),
+            "inserts_delta": inserts.get('bt'),
             "count_1m": data.get('bt_1m'),
             "fresh_ok": bool(bt_fresh_ok),
             "rate_ok": bool(bt_rate_ok)
@@ -157,10 +248,11 @@ async def main_async():
             report["ok"] = False
 
         # trades
-        tr_fresh_ok = (data.get('tr_last') is not None) and (data['tr_last'] <= freshness)
+        tr_fresh_ok = fresh_ok('tr')
         tr_rate_ok = (data.get('tr_1m') or 0) >= args.min_tr_per_minute
         report["checks"]["trades"] = {
             "fresh_seconds": data.get('tr_last'),
+            "inserts_delta": inserts.get('tr'),
             "count_1m": data.get('tr_1m'),
             "fresh_ok": bool(tr_fresh_ok),
             "rate_ok": bool(tr_rate_ok)
@@ -170,10 +262,11 @@ async def main_async():
 
         # depth_events — по требованию
         if args.depth_required:
-            de_fresh_ok = (data.get('de_last') is not None) and (data['de_last'] <= freshness)
+            de_fresh_ok = fresh_ok('de')
             de_rate_ok = (data.get('de_1m') or 0) >= args.min_de_per_minute
             report["checks"]["depth_events"] = {
                 "fresh_seconds": data.get('de_last'),
+                "inserts_delta": inserts.get('de'),
                 "count_1m": data.get('de_1m'),
                 "fresh_ok": bool(de_fresh_ok),
                 "rate_ok": bool(de_rate_ok)
@@ -184,7 +277,7 @@ async def main_async():
         print(json.dumps(report))
         return 0 if report["ok"] else 1
     finally:
-        await conn.close()
+        await pool.close()
 
 
 def main():
@@ -7,16 +7,20 @@ import asyncio
 import logging
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Tuple
 from dataclasses import dataclass
 from pathlib import Path
+from itertools import chain, groupby
 import sys
 
-# Добавляем путь к collector модулям
-sys.path.insert(0, str(Path(__file__).parent.parent))
+try:
+    import orjson
+except ImportError:  # отчет тогда пишется стандартным json
+    orjson = None
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     """Результат валидации"""
     test_name: str
@@ -26,7 +30,7 @@ class ValidationResult:
     actual_value: Any = None
     severity: str = "error"  # error, warning, info
 
-@dataclass
+@dataclass(slots=True)
 class DataQualityReport:
     """Отчет о качестве данных"""
     timestamp: datetime
@@ -84,12 +88,30 @@ class DataValidator:
                 'min_records_per_hour': 1000  # минимум записей в час для активной пары
             }
         }
+        
+        # Continuous aggregates, из которых можно брать объем за час вместо сырых таблиц:
+        # таблица -> (агрегат, колонка с количеством записей в бакете)
+        self.volume_aggregates = {
+            'book_ticker': ('bt_1s_continuous', 'tick_count'),
+            'trades': ('trade_1s_continuous', 'trade_count'),
+            'depth_events': ('depth_1s_continuous', 'update_count'),
+        }
+        
+        # Кэш колонок information_schema: table_name -> (time.monotonic() загрузки, строки колонок)
+        self._structure_cache: Dict[str, Tuple[float, List[Any]]] = {}
+        self.structure_cache_ttl = 300  # секунды
     
-    async def create_connection(self):
-        """Создает подключение к базе данных"""
+    def invalidate_structure_cache(self):
+        """Сбрасывает кэш структуры таблиц (например, после миграции схемы)"""
+        self._structure_cache.clear()
+    
+    async def create_pool(self):
+        """Создает пул подключений к базе данных (фазы валидации идут параллельно)"""
         try:
             import asyncpg
-            return await asyncpg.connect(self.connection_string)
+            # command_timeout: один зависший запрос не задерживает весь отчет дольше 30с
+            return await asyncpg.create_pool(self.connection_string, min_size=5, max_size=8,
+                                             command_timeout=30)
         except ImportError:
             self.logger.error("Требуется установка: pip install asyncpg")
             return None
@@ -97,157 +119,228 @@ class DataValidator:
             self.logger.error(f"Ошибка подключения к БД: {e}")
             return None
     
-    async def validate_table_structure(self, conn) -> List[ValidationResult]:
+    async def validate_table_structure(self, pool) -> List[ValidationResult]:
         """Валидирует структуру таблиц"""
         results = []
+        tables = list(self.requirements['data_types'].keys())
         
-        for table_name, required_columns in self.requirements['data_types'].items():
-            try:
-                # Получаем структуру таблицы
-                columns_query = """
-                SELECT column_name, data_type, is_nullable
-                FROM information_schema.columns 
-                WHERE table_name = $1
-                ORDER BY ordinal_position
-                """
-                
-                columns = await conn.fetch(columns_query, table_name)
-                actual_columns = [col['column_name'] for col in columns]
-                
-                # Проверяем наличие обязательных колонок
-                missing_columns = set(required_columns) - set(actual_columns)
-                
-                if missing_columns:
-                    results.append(ValidationResult(
-                        test_name=f"Table structure: {table_name}",
-                        passed=False,
-                        details=f"Отсутствуют обязательные колонки: {missing_columns}",
-                        expected_value=required_columns,
-                        actual_value=actual_columns,
-                        severity="error"
-                    ))
-                else:
-                    results.append(ValidationResult(
-                        test_name=f"Table structure: {table_name}",
-                        passed=True,
-                        details=f"Все обязательные колонки присутствуют",
-                        expected_value=required_columns,
-                        actual_value=actual_columns,
-                        severity="info"
-                    ))
-                    
-                # Проверяем типы данных
-                for col in columns:
-                    col_name = col['column_name']
-                    data_type = col['data_type']
-                    
-                    if col_name in ['bid_price', 'ask_price', 'price', 'quantity']:
-                        if 'numeric' not in data_type.lower() and 'decimal' not in data_type.lower():
-                            results.append(ValidationResult(
-                                test_name=f"Data type: {table_name}.{col_name}",
-                                passed=False,
-                                details=f"Неправильный тип данных для цены/количества: {data_type}",
-                                expected_value="NUMERIC/DECIMAL",
-                                actual_value=data_type,
-                                severity="warning"
-                            ))
-                            
-            except Exception as e:
-                results.append(ValidationResult(
+        # Структура меняется редко: в пределах TTL information_schema не запрашиваем
+        now = time.monotonic()
+        stale_tables = [
+            table_name for table_name in tables
+            if table_name not in self._structure_cache
+            or now - self._structure_cache[table_name][0] >= self.structure_cache_ttl
+        ]
+        
+        try:
+            # Колонки всех таблиц одним запросом; схемы - те же, что видит search_path
+            columns_query = """
+            SELECT table_name, column_name, data_type, is_nullable
+            FROM information_schema.columns 
+            WHERE table_schema = ANY(current_schemas(false))
+              AND table_name = ANY($1::text[])
+            ORDER BY table_name, ordinal_position
+            """
+            
+            if stale_tables:
+                async with pool.acquire() as conn:
+                    rows = await conn.fetch(columns_query, stale_tables)
+                fetched = {
+                    table_name: list(columns)
+                    for table_name, columns in groupby(rows, key=lambda row: row['table_name'])
+                }
+                for table_name in stale_tables:
+                    self._structure_cache[table_name] = (now, fetched.get(table_name, []))
+        except Exception as e:
+            return [
+                ValidationResult(
                     test_name=f"Table structure: {table_name}",
                     passed=False,
                     details=f"Ошибка проверки структуры: {e}",
                     severity="error"
-                ))
+                )
+                for table_name in tables
+            ]
+        
+        for table_name, required_columns in self.requirements['data_types'].items():
+            results.extend(self._check_table_columns(
+                table_name, required_columns, self._structure_cache[table_name][1]
+            ))
+        
+        return results
+
+    def _check_table_columns(self, table_name: str, required_columns: List[str],
+                             columns: List[Any]) -> List[ValidationResult]:
+        """Проверяет колонки и типы одной таблицы по строкам information_schema"""
+        results = []
+        actual_columns = [col['column_name'] for col in columns]
+        
+        # Проверяем наличие обязательных колонок
+        missing_columns = set(required_columns) - set(actual_columns)
+
+        if missing_columns:
+            results.append(ValidationResult(
+                test_name=f"Table structure: {table_name}",
+                passed=False,
+                details=f"Отсутствуют обязательные колонки: {missing_columns}",
+                expected_value=required_columns,
+                actual_value=actual_columns,
+                severity="error"
+            ))
+        else:
+            results.append(ValidationResult(
+                test_name=f"Table structure: {table_name}",
+                passed=True,
+                details=f"Все обязательные колонки присутствуют",
+                expected_value=required_columns,
+                actual_value=actual_columns,
+                severity="info"
+            ))
+
+        # Проверяем типы данных
+        for col in columns:
+            col_name = col['column_name']
+            data_type = col['data_type']
+
+            if col_name in ['bid_price', 'ask_price', 'price', 'quantity']:
+                if 'numeric' not in data_type.lower() and 'decimal' not in data_type.lower():
+                    results.append(ValidationResult(
+                        test_name=f"Data type: {table_name}.{col_name}",
+                        passed=False,
+                        details=f"Неправильный тип данных для цены/количества: {data_type}",
+                        expected_value="NUMERIC/DECIMAL",
+                        actual_value=data_type,
+                        severity="warning"
+                    ))
         
         return results
     
-    async def validate_data_freshness(self, conn) -> List[ValidationResult]:
+    async def _available_aggregates(self, pool) -> set:
+        """Имена существующих continuous aggregates (пусто без TimescaleDB)"""
+        try:
+            rows = await pool.fetch("SELECT view_name FROM timescaledb_information.continuous_aggregates")
+            return {row['view_name'] for row in rows}
+        except Exception:
+            return set()
+
+    async def validate_data_freshness(self, pool) -> List[ValidationResult]:
         """Валидирует свежесть данных"""
+        available_aggs = await self._available_aggregates(pool)
+        per_table = await asyncio.gather(*(
+            self._validate_table_freshness(pool, table_name, available_aggs)
+            for table_name in self.requirements['data_types'].keys()
+        ))
+        return list(chain.from_iterable(per_table))
+
+    async def _validate_table_freshness(self, pool, table_name: str,
+                                        available_aggs: set) -> List[ValidationResult]:
+        """Проверяет свежесть и объем данных одной таблицы"""
         results = []
+        # Граница окна - параметр запроса: планировщик видит константу и отсекает чанки
+        now_utc = datetime.now(timezone.utc)
+        cutoff = now_utc - timedelta(hours=1)
         
-        for table_name in self.requirements['data_types'].keys():
-            try:
-                # Проверяем последние обновления
-                freshness_query = f"""
+        try:
+            # Последняя запись - backward index scan по ts_exchange (в гипертаблице - только
+            # новейший чанк), объем за окно - отдельным запросом; оба идут параллельно
+            last_query = f"SELECT ts_exchange FROM {table_name} ORDER BY ts_exchange DESC LIMIT 1"
+            volume_query = f"""
+            SELECT 
+                count(*) as total_records,
+                count(DISTINCT symbol) as unique_symbols
+            FROM {table_name}
+            WHERE ts_exchange > $1
+            """
+            # Если есть 1s-агрегат, объем считаем по нему: строка на символ в секунду вместо
+            # каждого тика. Сырая таблица остается fallback'ом (агрегаты еще не созданы)
+            agg_name, count_column = self.volume_aggregates.get(table_name, (None, None))
+            if agg_name in available_aggs:
+                volume_query = f"""
                 SELECT 
-                    max(ts_exchange) as last_update,
-                    count(*) as total_records,
+                    coalesce(sum({count_column}), 0)::bigint as total_records,
                     count(DISTINCT symbol) as unique_symbols
-                FROM {table_name}
-                WHERE ts_exchange > now() - interval '1 hour'
+                FROM {agg_name}
+                WHERE ts_bucket > $1
                 """
-                
-                result = await conn.fetchrow(freshness_query)
-                
-                if not result['last_update']:
-                    results.append(ValidationResult(
-                        test_name=f"Data freshness: {table_name}",
-                        passed=False,
-                        details="Нет свежих данных за последний час",
-                        expected_value="Данные не старше 1 часа",
-                        actual_value="Нет данных",
-                        severity="error"
-                    ))
-                    continue
-                
-                # Проверяем возраст последних данных
-                last_update = result['last_update']
-                age_minutes = (datetime.utcnow().replace(tzinfo=last_update.tzinfo) - last_update).total_seconds() / 60
-                
-                if age_minutes > 10:  # Данные старше 10 минут
-                    results.append(ValidationResult(
-                        test_name=f"Data freshness: {table_name}",
-                        passed=False,
-                        details=f"Последние данные старше {age_minutes:.1f} минут",
-                        expected_value="< 10 минут",
-                        actual_value=f"{age_minutes:.1f} минут",
-                        severity="warning"
-                    ))
-                else:
-                    results.append(ValidationResult(
-                        test_name=f"Data freshness: {table_name}",
-                        passed=True,
-                        details=f"Данные свежие: {age_minutes:.1f} минут назад",
-                        expected_value="< 10 минут",
-                        actual_value=f"{age_minutes:.1f} минут",
-                        severity="info"
-                    ))
-                
-                # Проверяем объем данных
-                min_records = self.requirements['data_quality']['min_records_per_hour']
-                if result['total_records'] < min_records:
-                    results.append(ValidationResult(
-                        test_name=f"Data volume: {table_name}",
-                        passed=False,
-                        details=f"Недостаточно данных за час: {result['total_records']}",
-                        expected_value=f">= {min_records}",
-                        actual_value=result['total_records'],
-                        severity="warning"
-                    ))
-                else:
-                    results.append(ValidationResult(
-                        test_name=f"Data volume: {table_name}",
-                        passed=True,
-                        details=f"Достаточно данных: {result['total_records']} записей",
-                        expected_value=f">= {min_records}",
-                        actual_value=result['total_records'],
-                        severity="info"
-                    ))
-                    
-            except Exception as e:
+
+            last_update, result = await asyncio.gather(
+                pool.fetchval(last_query),
+                pool.fetchrow(volume_query, cutoff),
+            )
+
+            if last_update is not None and last_update.tzinfo is None:
+                last_update = last_update.replace(tzinfo=timezone.utc)  # колонка timestamp без зоны - считаем UTC
+            if last_update is None or last_update <= cutoff:
                 results.append(ValidationResult(
                     test_name=f"Data freshness: {table_name}",
                     passed=False,
-                    details=f"Ошибка проверки свежести: {e}",
+                    details="Нет свежих данных за последний час",
+                    expected_value="Данные не старше 1 часа",
+                    actual_value="Нет данных",
                     severity="error"
                 ))
+                return results
+
+            # Проверяем возраст последних данных
+            age_minutes = (now_utc - last_update).total_seconds() / 60
+
+            if age_minutes > 10:  # Данные старше 10 минут
+                results.append(ValidationResult(
+                    test_name=f"Data freshness: {table_name}",
+                    passed=False,
+                    details=f"Последние данные старше {age_minutes:.1f} минут",
+                    expected_value="< 10 минут",
+                    actual_value=f"{age_minutes:.1f} минут",
+                    severity="warning"
+                ))
+            else:
+                results.append(ValidationResult(
+                    test_name=f"Data freshness: {table_name}",
+                    passed=True,
+                    details=f"Данные свежие: {age_minutes:.1f} минут назад",
+                    expected_value="< 10 минут",
+                    actual_value=f"{age_minutes:.1f} минут",
+                    severity="info"
+                ))
+
+            # Проверяем объем данных
+            min_records = self.requirements['data_quality']['min_records_per_hour']
+            if result['total_records'] < min_records:
+                results.append(ValidationResult(
+                    test_name=f"Data volume: {table_name}",
+                    passed=False,
+                    details=f"Недостаточно данных за час: {result['total_records']}",
+                    expected_value=f">= {min_records}",
+                    actual_value=result['total_records'],
+                    severity="warning"
+                ))
+            else:
+                results.append(ValidationResult(
+                    test_name=f"Data volume: {table_name}",
+                    passed=True,
+                    details=f"Достаточно данных: {result['total_records']} записей",
+                    expected_value=f">= {min_records}",
+                    actual_value=result['total_records'],
+                    severity="info"
+                ))
+
+        except Exception as e:
+            results.append(ValidationResult(
+                test_name=f"Data freshness: {table_name}",
+                passed=False,
+                details=f"Ошибка проверки свежести: {e}",
+                severity="error"
+            ))
         
         return results
     
     async def validate_data_quality(self, conn) -> List[ValidationResult]:
         """Валидирует качество данных"""
         results = []
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=1)
+        # Порог спреда и его текстовое представление - один раз на вызов, а не на символ
+        max_spread_pct = self.requirements['data_quality']['max_spread_percent']
+        expected_spread = f"<= {max_spread_pct}%"
         
         try:
             # Проверяем качество book_ticker данных
@@ -255,31 +348,37 @@ class DataValidator:
             SELECT 
                 symbol,
                 count(*) as records,
-                avg((ask_price - bid_price) / ((ask_price + bid_price) / 2) * 100) as avg_spread_percent,
-                max((ask_price - bid_price) / ((ask_price + bid_price) / 2) * 100) as max_spread_percent,
-                count(CASE WHEN bid_price <= 0 OR ask_price <= 0 THEN 1 END) as invalid_prices,
-                count(CASE WHEN bid_qty <= 0 OR ask_qty <= 0 THEN 1 END) as invalid_quantities,
-                count(CASE WHEN ask_price <= bid_price THEN 1 END) as inverted_spread
-            FROM book_ticker 
-            WHERE ts_exchange > now() - interval '1 hour'
+                avg(spread_percent) as avg_spread_percent,
+                max(spread_percent) as max_spread_percent,
+                count(*) FILTER (WHERE bid_price <= 0 OR ask_price <= 0) as invalid_prices,
+                count(*) FILTER (WHERE bid_qty <= 0 OR ask_qty <= 0) as invalid_quantities,
+                count(*) FILTER (WHERE ask_price <= bid_price) as inverted_spread
+            FROM (
+                -- Спред считается один раз на строку; nullif - защита от деления на ноль
+                SELECT 
+                    symbol, bid_price, ask_price, bid_qty, ask_qty,
+                    (ask_price - bid_price) / nullif((ask_price + bid_price) / 2, 0) * 100 as spread_percent
+                FROM book_ticker 
+                WHERE ts_exchange > $1
+            ) bt
             GROUP BY symbol
             ORDER BY records DESC
             LIMIT 10
             """
             
-            bt_stats = await conn.fetch(bt_quality_query)
+            bt_stats = await conn.fetch(bt_quality_query, cutoff)
             
             for stat in bt_stats:
                 symbol = stat['symbol']
                 
                 # Проверяем спред
                 max_spread = stat['max_spread_percent'] or 0
-                if max_spread > self.requirements['data_quality']['max_spread_percent']:
+                if max_spread > max_spread_pct:
                     results.append(ValidationResult(
                         test_name=f"Spread quality: {symbol}",
                         passed=False,
                         details=f"Максимальный спред слишком большой: {max_spread:.3f}%",
-                        expected_value=f"<= {self.requirements['data_quality']['max_spread_percent']}%",
+                        expected_value=expected_spread,
                         actual_value=f"{max_spread:.3f}%",
                         severity="warning"
                     ))
@@ -288,7 +387,7 @@ class DataValidator:
                         test_name=f"Spread quality: {symbol}",
                         passed=True,
                         details=f"Спред в норме: max {max_spread:.3f}%",
-                        expected_value=f"<= {self.requirements['data_quality']['max_spread_percent']}%",
+                        expected_value=expected_spread,
                         actual_value=f"{max_spread:.3f}%",
                         severity="info"
                     ))
@@ -337,16 +436,16 @@ class DataValidator:
             trades_quality_query = """
             SELECT 
                 count(*) as total_trades,
-                count(CASE WHEN price <= 0 THEN 1 END) as invalid_prices,
-                count(CASE WHEN quantity <= 0 THEN 1 END) as invalid_quantities,
+                count(*) FILTER (WHERE price <= 0) as invalid_prices,
+                count(*) FILTER (WHERE quantity <= 0) as invalid_quantities,
                 avg(quantity) as avg_trade_size,
-                count(CASE WHEN is_buyer_maker = true THEN 1 END) as maker_trades,
-                count(CASE WHEN is_buyer_maker = false THEN 1 END) as taker_trades
+                count(*) FILTER (WHERE is_buyer_maker = true) as maker_trades,
+                count(*) FILTER (WHERE is_buyer_maker = false) as taker_trades
             FROM trades 
-            WHERE ts_exchange > now() - interval '1 hour'
+            WHERE ts_exchange > $1
             """
             
-            trades_stat = await conn.fetchrow(trades_quality_query)
+            trades_stat = await conn.fetchrow(trades_quality_query, cutoff)
             
             if trades_stat:
                 # Проверяем соотношение maker/taker
@@ -405,27 +504,47 @@ class DataValidator:
     async def validate_update_frequency(self, conn) -> List[ValidationResult]:
         """Валидирует частоту обновлений данных"""
         results = []
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=10)
+        expected_max = self.requirements['update_frequency']['book_ticker']
         
         try:
+            # p95: при наличии timescaledb_toolkit - потоковый t-digest (без сортировки всех
+            # интервалов символа), иначе точный percentile_disc
+            has_toolkit = await conn.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'timescaledb_toolkit')"
+            )
+            if has_toolkit:
+                p95_expr = "approx_percentile(0.95, percentile_agg(dt_ms))"
+            else:
+                p95_expr = "percentile_disc(0.95) WITHIN GROUP (ORDER BY dt_ms)"
+            
             # Анализируем интервалы между обновлениями
-            frequency_query = """
+            frequency_query = f"""
             WITH intervals AS (
+                -- Время в epoch-миллисекундах считается один раз на строку
                 SELECT 
                     symbol,
-                    ts_exchange,
-                    LAG(ts_exchange) OVER (PARTITION BY symbol ORDER BY ts_exchange) as prev_ts
-                FROM book_ticker 
-                WHERE ts_exchange > now() - interval '10 minutes'
+                    ts_ms,
+                    LAG(ts_ms) OVER (PARTITION BY symbol ORDER BY ts_ms) as prev_ts_ms
+                FROM (
+                    SELECT symbol, EXTRACT(epoch FROM ts_exchange) * 1000 as ts_ms
+                    FROM book_ticker 
+                    WHERE ts_exchange > $1
+                ) bt
+            ),
+            deltas AS (
+                SELECT symbol, ts_ms - prev_ts_ms as dt_ms
+                FROM intervals 
+                WHERE prev_ts_ms IS NOT NULL
             ),
             interval_stats AS (
                 SELECT 
                     symbol,
                     count(*) as updates,
-                    avg(EXTRACT(milliseconds FROM (ts_exchange - prev_ts))) as avg_interval_ms,
-                    max(EXTRACT(milliseconds FROM (ts_exchange - prev_ts))) as max_interval_ms,
-                    percentile_disc(0.95) WITHIN GROUP (ORDER BY EXTRACT(milliseconds FROM (ts_exchange - prev_ts))) as p95_interval_ms
-                FROM intervals 
-                WHERE prev_ts IS NOT NULL
+                    avg(dt_ms) as avg_interval_ms,
+                    max(dt_ms) as max_interval_ms,
+                    {p95_expr} as p95_interval_ms
+                FROM deltas 
                 GROUP BY symbol
             )
             SELECT * FROM interval_stats 
@@ -434,7 +553,7 @@ class DataValidator:
             LIMIT 5
             """
             
-            freq_stats = await conn.fetch(frequency_query)
+            freq_stats = await conn.fetch(frequency_query, cutoff)
             
             for stat in freq_stats:
                 symbol = stat['symbol']
@@ -442,8 +561,6 @@ class DataValidator:
                 max_interval = stat['max_interval_ms'] or 0
                 p95_interval = stat['p95_interval_ms'] or 0
                 
-                expected_max = self.requirements['update_frequency']['book_ticker']
-                
                 if avg_interval > expected_max:
                     results.append(ValidationResult(
                         test_name=f"Update frequency: {symbol}",
@@ -487,6 +604,7 @@ class DataValidator:
     async def validate_continuous_aggregates(self, conn) -> List[ValidationResult]:
         """Валидирует работу continuous aggregates"""
         results = []
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=1)
         
         try:
             # Проверяем наличие агрегатов
@@ -520,37 +638,44 @@ class DataValidator:
                     severity="info"
                 ))
             
-            # Проверяем актуальность агрегатов
-            for agg_name in expected_aggregates:
-                if agg_name in found_aggs:
-                    agg_data_query = f"""
+            # Проверяем актуальность агрегатов: все найденные - одним UNION ALL запросом.
+            # В SQL подставляются только имена из expected_aggregates
+            present_aggs = [agg_name for agg_name in expected_aggregates if agg_name in found_aggs]
+            if present_aggs:
+                agg_data_query = " UNION ALL ".join(
+                    f"""
                     SELECT 
+                        '{agg_name}' as name,
                         count(*) as records,
                         max(ts_bucket) as last_bucket
                     FROM {agg_name}
-                    WHERE ts_bucket > now() - interval '1 hour'
+                    WHERE ts_bucket > $1
                     """
-                    
-                    agg_stat = await conn.fetchrow(agg_data_query)
-                    
-                    if agg_stat['records'] == 0:
-                        results.append(ValidationResult(
-                            test_name=f"Aggregate data: {agg_name}",
-                            passed=False,
-                            details="Нет данных в агрегате за последний час",
-                            expected_value="> 0",
-                            actual_value="0",
-                            severity="warning"
-                        ))
-                    else:
-                        results.append(ValidationResult(
-                            test_name=f"Aggregate data: {agg_name}",
-                            passed=True,
-                            details=f"Агрегат содержит {agg_stat['records']} записей",
-                            expected_value="> 0",
-                            actual_value=agg_stat['records'],
-                            severity="info"
-                        ))
+                    for agg_name in present_aggs
+                )
+                agg_stats = {row['name']: row for row in await conn.fetch(agg_data_query, cutoff)}
+            
+            for agg_name in present_aggs:
+                agg_stat = agg_stats[agg_name]
+                
+                if agg_stat['records'] == 0:
+                    results.append(ValidationResult(
+                        test_name=f"Aggregate data: {agg_name}",
+                        passed=False,
+                        details="Нет данных в агрегате за последний час",
+                        expected_value="> 0",
+                        actual_value="0",
+                        severity="warning"
+                    ))
+                else:
+                    results.append(ValidationResult(
+                        test_name=f"Aggregate data: {agg_name}",
+                        passed=True,
+                        details=f"Агрегат содержит {agg_stat['records']} записей",
+                        expected_value="> 0",
+                        actual_value=agg_stat['records'],
+                        severity="info"
+                    ))
                         
         except Exception as e:
             results.append(ValidationResult(
@@ -562,37 +687,54 @@ class DataValidator:
         
         return results
     
+    async def _run_phase(self, pool, phase) -> List[ValidationResult]:
+        """Выполняет фазу валидации на отдельном соединении из пула"""
+        async with pool.acquire() as conn:
+            return await phase(conn)
+
+    def _failure_report(self, test_name: str, details: str) -> DataQualityReport:
+        """Отчет из одного проваленного теста (валидация не выполнялась)"""
+        return DataQualityReport(
+            timestamp=datetime.now(timezone.utc),
+            total_tests=1,
+            passed_tests=0,
+            failed_tests=1,
+            warnings=0,
+            overall_score=0.0,
+            results=[ValidationResult(
+                test_name=test_name,
+                passed=False,
+                details=details,
+                severity="error"
+            )]
+        )
+
     async def run_full_validation(self) -> DataQualityReport:
         """Запускает полную валидацию всех компонентов"""
         self.logger.info("🔍 Начинаем полную валидацию данных...")
         
-        conn = await self.create_connection()
-        if not conn:
+        pool = await self.create_pool()
+        if not pool:
             # Возвращаем отчет об ошибке подключения
-            return DataQualityReport(
-                timestamp=datetime.utcnow(),
-                total_tests=1,
-                passed_tests=0,
-                failed_tests=1,
-                warnings=0,
-                overall_score=0.0,
-                results=[ValidationResult(
-                    test_name="Database connection",
-                    passed=False,
-                    details="Не удалось подключиться к базе данных",
-                    severity="error"
-                )]
-            )
+            return self._failure_report("Database connection", "Не удалось подключиться к базе данных")
         
         try:
-            all_results = []
+            # Дешевая проверка доступности: если БД не отвечает, не нагружаем ее агрегациями
+            try:
+                await asyncio.wait_for(pool.fetchval("SELECT 1"), timeout=2.0)
+            except Exception as e:
+                return self._failure_report("DB reachability", f"База данных не отвечает: {e!r}")
             
-            # Выполняем все валидации
-            all_results.extend(await self.validate_table_structure(conn))
-            all_results.extend(await self.validate_data_freshness(conn))
-            all_results.extend(await self.validate_data_quality(conn))
-            all_results.extend(await self.validate_update_frequency(conn))
-            all_results.extend(await self.validate_continuous_aggregates(conn))
+            # Фазы независимы и только читают: выполняем параллельно, порядок результатов сохраняется
+            # Структура и свежесть сами раздают запросы по таблицам на соединения пула
+            phase_results = await asyncio.gather(
+                self.validate_table_structure(pool),
+                self.validate_data_freshness(pool),
+                self._run_phase(pool, self.validate_data_quality),
+                self._run_phase(pool, self.validate_update_frequency),
+                self._run_phase(pool, self.validate_continuous_aggregates),
+            )
+            all_results = list(chain.from_iterable(phase_results))
             
             # Подсчитываем статистику
             total_tests = len(all_results)
@@ -610,7 +752,7 @@ class DataValidator:
                 overall_score = 0
             
             return DataQualityReport(
-                timestamp=datetime.utcnow(),
+                timestamp=datetime.now(timezone.utc),
                 total_tests=total_tests,
                 passed_tests=passed_tests,
                 failed_tests=failed_tests,
@@ -620,7 +762,7 @@ class DataValidator:
             )
             
         finally:
-            await conn.close()
+            await pool.close()
 
 
 async def main():
@@ -667,8 +809,12 @@ async def main():
     report_file = Path("logs/data_quality_report.json")
     report_file.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(report_file, 'w', encoding='utf-8') as f:
-        json.dump(report.to_dict(), f, indent=2, ensure_ascii=False)
+    # orjson сразу отдает UTF-8 байты: один write без посимвольного кодирования
+    if orjson is not None:
+        report_file.write_bytes(orjson.dumps(report.to_dict(), option=orjson.OPT_INDENT_2, default=str))
+    else:
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict(), f, indent=2, ensure_ascii=False)
     
     print(f"💾 Отчет сохранен: {report_file}")
     
@@ -3,10 +3,13 @@ WebSocket клиент для подключения к Binance API и полу
 """
 
 import asyncio
-import json
 import logging
+import time
+from collections import deque
+import orjson
 import websockets
-from typing import Optional, Callable, Dict, Any
+from typing import Optional, Callable, Dict, Any, List
+from urllib.parse import urlparse
 from datetime import datetime
 
 
@@ -36,19 +39,40 @@ class BinanceCollector:
         api_creds = config.get('api_credentials', {})
         self.api_key = api_creds.get('api_key', '')
         self.ws_url = api_creds.get('ws_url', 'wss://fstream.binance.com/ws/')
+        # URL потока не меняется между переподключениями - собираем один раз
+        self._ws_full_url = self._stream_url()
         
         # WebSocket настройки
         ws_config = config.get('websocket', {})
         self.reconnect_interval = ws_config.get('reconnect_interval', 5)
         self.ping_interval = ws_config.get('ping_interval', 20)
         self.max_reconnects = ws_config.get('max_reconnects', 100)
+        # Буфер между чтением WebSocket и процессором: читатель только складывает кадры,
+        # потребитель отдает их процессору пачками
+        self.batch_size = ws_config.get('batch_size', 100)
+        self.max_buffered = ws_config.get('max_buffered', 10000)
         
         # Статистика
         self.reconnect_count = 0
         self.message_count = 0
-        self.start_time = None
+        self.start_time = None  # wall-clock, только для отображения
+        self._t0: Optional[float] = None  # monotonic, для расчета времени работы
         self.is_running = False
         self._first_messages_logged = 0  # для детальной отладки первых событий
+        # Обратные счетчики вместо message_count % N на каждом кадре
+        self._log_every = 1000
+        self._log_ticks = self._log_every
+        self._debug_every = 200
+        self._debug_ticks = self._debug_every
+        self._log_info = self.logger.info
+        
+        # Очередь с единственным потребителем: deque + Future дешевле asyncio.Queue
+        self._buf: deque = deque()
+        self._wake: Optional[asyncio.Future] = None
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._reader_task: Optional[asyncio.Task] = None
         
         # Проверка API ключа
         if not self.api_key:
@@ -61,10 +85,29 @@ class BinanceCollector:
         Запуск сбора данных с автоматическим переподключением.
         """
         self.start_time = datetime.now()
+        self._t0 = time.monotonic()
         self.is_running = True
         
         self.logger.info(f"Starting data collection for {self.symbol}")
+        self._consumer_task = asyncio.create_task(self._consume_loop())
         
+        # stop() отменяет читателя - цикл по сообщениям не проверяет флаг на каждом кадре
+        self._reader_task = asyncio.create_task(self._reconnect_loop())
+        try:
+            await self._reader_task
+        except asyncio.CancelledError:
+            if self.is_running:
+                raise  # отменили снаружи, а не через stop()
+        finally:
+            # Дорабатываем накопленное и останавливаем потребителя
+            self.is_running = False
+            self._wake_consumer()
+            await self._consumer_task
+            
+    async def _reconnect_loop(self) -> None:
+        """
+        Подключение с повторными попытками до остановки или исчерпания лимита.
+        """
         while self.is_running and self.reconnect_count < self.max_reconnects:
             try:
                 await self._connect()
@@ -86,9 +129,7 @@ class BinanceCollector:
         """
         Установка WebSocket соединения и обработка сообщений.
         """
-        # URL для подписки на обновления orderbook
-        stream_name = f"{self.symbol.lower()}@depth"
-        url = f"{self.ws_url}{stream_name}"
+        url = self._ws_full_url
         
         self.logger.info(f"Connecting to {url}")
         if self.logger.isEnabledFor(logging.DEBUG):
@@ -100,29 +141,41 @@ class BinanceCollector:
             url,
             ping_interval=self.ping_interval,
             ping_timeout=10,
-            close_timeout=10
+            close_timeout=10,
+            # permessage-deflate не нужен: на мелких JSON кадрах распаковка zlib
+            # стоит больше CPU, чем экономит трафика, и держит буферы на соединение
+            compression=None
         ) as websocket:
             self.logger.info(f"Connected to Binance WebSocket for {self.symbol}")
             self.reconnect_count = 0
             
             async for message in websocket:
-                if not self.is_running:
-                    break
+                # Backpressure: процессор не успевает - перестаем читать сокет
+                if len(self._buf) >= self.max_buffered:
+                    self._drained.clear()
+                    await self._drained.wait()
                     
                 try:
                     await self._process_message(message)
                 except Exception as e:
-                    self.logger.error(f"Error processing message: {e}")
+                    self.logger.error("Error processing message: %s", e)
                     
-    async def _process_message(self, message: str) -> None:
+    async def _process_message(self, message: str | bytes) -> None:
         """
         Обработка входящего сообщения с данными orderbook.
         
         Args:
-            message: JSON строка с данными от Binance
+            message: JSON строка (или bytes) с данными от Binance
         """
+        # Кадры без depthUpdate (ответы на подписку и т.п.) отбрасываем до парсинга:
+        # поиск подстроки дешевле полного разбора JSON. Проверка после парсинга остается
+        marker = b'"depthUpdate"' if isinstance(message, bytes) else '"depthUpdate"'
+        if marker not in message:
+            return
+            
         try:
-            data = json.loads(message)
+            # orjson парсит str и bytes напрямую, в разы быстрее json.loads на массивах уровней
+            data = self._decode(message)
             
             # Проверка типа сообщения
             if 'e' not in data or data['e'] != 'depthUpdate':
@@ -130,37 +183,86 @@ class BinanceCollector:
                 
             self.message_count += 1
             
-            # Добавление метки времени получения
-            data['local_timestamp'] = datetime.now().timestamp() * 1000000  # микросекунды
+            # Метка времени получения идет рядом с событием, а не ключом в разобранный dict
+            local_ts = time.time_ns() // 1000  # микросекунды (int, без datetime)
             
             # Детальная отладка первых сообщений и периодическая выборка
-            if self._first_messages_logged < 5 or (self.message_count % 200 == 0):
-                try:
-                    bids = data.get('b') or []
-                    asks = data.get('a') or []
-                    self.logger.debug(
-                        f"depthUpdate {self.symbol} E={data.get('E')} U={data.get('U')} u={data.get('u')} b#={len(bids)} a#={len(asks)}"
-                    )
-                except Exception:
-                    pass
+            self._debug_ticks -= 1
+            if self._first_messages_logged < 5 or not self._debug_ticks:
+                self._debug_ticks = self._debug_ticks or self._debug_every
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    try:
+                        bids = data.get('b') or []
+                        asks = data.get('a') or []
+                        self.logger.debug(
+                            "depthUpdate %s E=%s U=%s u=%s b#=%d a#=%d",
+                            data.get('s'), data.get('E'), data.get('U'), data.get('u'), len(bids), len(asks)
+                        )
+                    except Exception:
+                        pass
                 self._first_messages_logged += 1
 
-            # Передача данных процессору
-            await self.processor.process_orderbook_update(data)
+            # Передача данных процессору через буфер потребителя
+            self._buf.append((data, local_ts))
+            self._wake_consumer()
             
-            if self.message_count % 1000 == 0:
-                self.logger.info(f"Processed {self.message_count} messages")
+            self._log_ticks -= 1
+            if not self._log_ticks:
+                self._log_ticks = self._log_every
+                self._log_info("Processed %d messages", self.message_count)
                 
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Invalid JSON message: {e}")
+        except orjson.JSONDecodeError as e:
+            self.logger.error("Invalid JSON message: %s", e)
         except Exception as e:
-            self.logger.error(f"Error in message processing: {e}")
+            self.logger.error("Error in message processing: %s", e)
+            
+    def _stream_url(self) -> str:
+        """URL потока depth для одного символа."""
+        return f"{self.ws_url}{self.symbol.lower()}@depth"
+        
+    # Разбор кадра: у одиночного потока событие лежит на верхнем уровне
+    _decode = staticmethod(orjson.loads)
+    
+    async def _dispatch_batch(self, batch: list) -> None:
+        """Передача пачки пар (событие, local_ts) процессору."""
+        await self.processor.process_batch(batch)
+            
+    def _wake_consumer(self) -> None:
+        """Будит потребителя, если он ждет новых данных."""
+        if self._wake is not None and not self._wake.done():
+            self._wake.set_result(None)
+            
+    async def _consume_loop(self) -> None:
+        """
+        Единственный потребитель буфера: забирает до batch_size кадров
+        и передает их процессору одним вызовом.
+        """
+        loop = asyncio.get_running_loop()
+        while self.is_running or self._buf:
+            if not self._buf:
+                self._wake = loop.create_future()
+                await self._wake
+                self._wake = None
+                continue
+                
+            batch = [self._buf.popleft() for _ in range(min(self.batch_size, len(self._buf)))]
+            if len(self._buf) < self.max_buffered:
+                self._drained.set()
+            try:
+                await self._dispatch_batch(batch)
+            except Exception as e:
+                self.logger.error("Error processing batch: %s", e)
+        self._drained.set()
             
     def stop(self) -> None:
         """
         Остановка сбора данных.
         """
         self.is_running = False
+        if self._reader_task is not None and not self._reader_task.done():
+            self._reader_task.cancel()
+        self._wake_consumer()
+        self._drained.set()
         self.logger.info("Stopping data collection")
         
     def get_stats(self) -> Dict[str, Any]:
@@ -171,8 +273,9 @@ class BinanceCollector:
             Словарь со статистикой
         """
         runtime = None
-        if self.start_time:
-            runtime = (datetime.now() - self.start_time).total_seconds()
+        if self._t0 is not None:
+            # monotonic не зависит от переводов системных часов
+            runtime = time.monotonic() - self._t0
             
         return {
             'symbol': self.symbol,
@@ -181,4 +284,66 @@ class BinanceCollector:
             'reconnect_count': self.reconnect_count,
             'runtime_seconds': runtime,
             'messages_per_second': self.message_count / runtime if runtime else 0
-        }
\ No newline at end of file
+        }
+
+
+def _decode_combined(message: str | bytes) -> Dict[str, Any]:
+    """Разбор кадра combined stream: {"stream": "...", "data": {...}}."""
+    return orjson.loads(message).get('data') or {}
+
+
+class MultiSymbolBinanceCollector(BinanceCollector):
+    """
+    Сбор orderbook для нескольких символов через одно соединение.
+    
+    Подписывается на combined stream Binance (/stream?streams=a@depth/b@depth/...)
+    вместо отдельного WebSocket на каждый символ и раздает события
+    процессорам по полю 's'. Binance Futures допускает до MAX_STREAMS
+    потоков на соединение.
+    """
+    
+    MAX_STREAMS = 200
+    
+    def __init__(self, symbols: List[str], processors: Dict[str, Any], config: Dict[str, Any]):
+        """
+        Инициализация коллектора.
+        
+        Args:
+            symbols: Список торговых пар (не более MAX_STREAMS)
+            processors: Обработчики по символу {symbol: OrderBookProcessor}
+            config: Конфигурация системы
+        """
+        if not symbols:
+            raise ValueError("symbols must not be empty")
+        if len(symbols) > self.MAX_STREAMS:
+            raise ValueError(f"Too many streams for one connection: {len(symbols)} > {self.MAX_STREAMS}")
+            
+        self.symbols = [s.upper() for s in symbols]
+        self.processors = {s.upper(): p for s, p in processors.items()}
+        super().__init__(symbol=",".join(self.symbols), processor=None, config=config)
+        
+    def _stream_url(self) -> str:
+        """URL combined stream для всех символов."""
+        # Принимаем base вида wss://fstream.binance.com/ws/ или wss://fstream.binance.com
+        parsed = urlparse(self.ws_url)
+        host = f"{parsed.scheme}://{parsed.netloc}" if parsed.scheme and parsed.netloc else self.ws_url.rstrip('/')
+        streams = "/".join(f"{s.lower()}@depth" for s in self.symbols)
+        return f"{host}/stream?streams={streams}"
+        
+    _decode = staticmethod(_decode_combined)
+    
+    async def _dispatch_batch(self, batch: list) -> None:
+        """Раздача пачки процессорам символов с сохранением порядка внутри символа."""
+        by_symbol: Dict[str, list] = {}
+        for item in batch:
+            by_symbol.setdefault(item[0].get('s'), []).append(item)
+            
+        for symbol, events in by_symbol.items():
+            processor = self.processors.get(symbol)
+            if processor is None:
+                self.logger.warning("No processor for symbol %s, dropped %d events", symbol, len(events))
+                continue
+            try:
+                await processor.process_batch(events)
+            except Exception as e:
+                self.logger.error("Error processing batch for %s: %s", symbol, e)
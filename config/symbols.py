@@ -2,7 +2,7 @@
 # Updated: September 2025
 # Source: Binance Futures volume analysis
 
-TOP_200_SYMBOLS = [
+_RAW_SYMBOLS = [
     # Tier 1: Major cryptocurrencies (Top 20 by volume)
     "BTCUSDT", "ETHUSDT", "BNBUSDT", "XRPUSDT", "ADAUSDT",
     "SOLUSDT", "DOGEUSDT", "TRXUSDT", "MATICUSDT", "DOTUSDT",
@@ -66,17 +66,39 @@ TOP_200_SYMBOLS = [
     "POPCATUSDT", "SUNUSDT", "CATUSDT", "XUSDT", "HMSTRUSDT"
 ]
 
-# Символы сгруппированы по приоритетам для поэтапного развертывания
+# Резерв для добора до 200 после удаления повторов из тиров выше
+_RESERVE_SYMBOLS = [
+    "JASMYUSDT", "IMXUSDT", "MASKUSDT", "LRCUSDT", "ROSEUSDT",
+    "GMTUSDT", "WOOUSDT", "JTOUSDT", "PYTHUSDT", "STXUSDT",
+]
+
+# Повторы удаляются с сохранением порядка (первое вхождение задает тир),
+# иначе дубликат означает второе WebSocket-подключение на тот же символ
+TOP_200_SYMBOLS = list(dict.fromkeys(_RAW_SYMBOLS))
+TOP_200_SYMBOLS += [s for s in _RESERVE_SYMBOLS if s not in TOP_200_SYMBOLS][:200 - len(TOP_200_SYMBOLS)]
+
+# Символы сгруппированы по приоритетам для поэтапного развертывания.
+# frozenset - для O(1) проверки принадлежности, порядок обхода - PRIORITY_ORDER
 PRIORITY_GROUPS = {
-    "critical": TOP_200_SYMBOLS[:20],      # Запускаем первыми
-    "high": TOP_200_SYMBOLS[20:60],        # Добавляем через час
-    "medium": TOP_200_SYMBOLS[60:120],     # Добавляем через день
-    "low": TOP_200_SYMBOLS[120:200]        # Добавляем через неделю
+    "critical": frozenset(TOP_200_SYMBOLS[:20]),      # Запускаем первыми
+    "high": frozenset(TOP_200_SYMBOLS[20:60]),        # Добавляем через час
+    "medium": frozenset(TOP_200_SYMBOLS[60:120]),     # Добавляем через день
+    "low": frozenset(TOP_200_SYMBOLS[120:200])        # Добавляем через неделю
 }
 
-# Проверка уникальности символов
-assert len(TOP_200_SYMBOLS) == len(set(TOP_200_SYMBOLS)), "Duplicate symbols found!"
-assert len(TOP_200_SYMBOLS) == 200, f"Expected 200 symbols, got {len(TOP_200_SYMBOLS)}"
+# Символы в порядке приоритета (для последовательного запуска)
+PRIORITY_ORDER = tuple(TOP_200_SYMBOLS)
+
+
+def validate_symbols():
+    """Валидация списка символов (запускается отдельно: python config/symbols.py)"""
+    assert len(TOP_200_SYMBOLS) == len(set(TOP_200_SYMBOLS)), "Duplicate symbols found!"
+    assert len(TOP_200_SYMBOLS) == 200, f"Expected 200 symbols, got {len(TOP_200_SYMBOLS)}"
+    
+    print(f"✅ Configured {len(TOP_200_SYMBOLS)} unique trading pairs")
+    print(f"📊 Priority groups: {[len(group) for group in PRIORITY_GROUPS.values()]}")
+    return True
+
 
-print(f"✅ Configured {len(TOP_200_SYMBOLS)} unique trading pairs")
-print(f"📊 Priority groups: {[len(group) for group in PRIORITY_GROUPS.values()]}")
\ No newline at end of file
+if __name__ == "__main__":
+    validate_symbols()
\ No newline at end of file
@@ -7,11 +7,14 @@
 import asyncio
 import json
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import argparse
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import websockets
 from dataclasses import dataclass, asdict
 
@@ -53,10 +56,21 @@ class RemoteCollectorClient:
         self.server_url = server_url.rstrip('/')
         self.ws_url = server_url.replace('http://', 'ws://').replace('https://', 'wss://') + "/ws/monitoring"
         
+        # Одна сессия на клиента: keep-alive переиспользует TCP/TLS соединения.
+        # Retry по умолчанию не повторяет POST (start/stop не идемпотентны)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
     def get_status(self) -> Optional[CollectorStatus]:
         """Получить текущий статус коллектора"""
         try:
-            response = requests.get(f"{self.server_url}/api/collector/status", timeout=10)
+            response = self.session.get(f"{self.server_url}/api/collector/status", timeout=10)
             response.raise_for_status()
             data = response.json()
             return CollectorStatus(**data)
@@ -72,7 +86,7 @@ class RemoteCollectorClient:
                 "database_url": database_url,
                 "log_level": log_level
             }
-            response = requests.post(
+            response = self.session.post(
                 f"{self.server_url}/api/collector/start",
                 json=config,
                 timeout=30
@@ -92,7 +106,7 @@ class RemoteCollectorClient:
     def stop_collector(self) -> bool:
         """Остановить коллектор"""
         try:
-            response = requests.post(f"{self.server_url}/api/collector/stop", timeout=30)
+            response = self.session.post(f"{self.server_url}/api/collector/stop", timeout=30)
             response.raise_for_status()
             result = response.json()
             if result.get("success"):
@@ -108,7 +122,7 @@ class RemoteCollectorClient:
     def restart_collector(self) -> bool:
         """Перезапустить коллектор"""
         try:
-            response = requests.post(f"{self.server_url}/api/collector/restart", timeout=60)
+            response = self.session.post(f"{self.server_url}/api/collector/restart", timeout=60)
             response.raise_for_status()
             result = response.json()
             if result.get("success"):
@@ -124,7 +138,7 @@ class RemoteCollectorClient:
     def get_database_stats(self) -> Optional[DatabaseStats]:
         """Получить статистику БД"""
         try:
-            response = requests.get(f"{self.server_url}/api/database/stats", timeout=10)
+            response = self.session.get(f"{self.server_url}/api/database/stats", timeout=10)
             response.raise_for_status()
             data = response.json()
             return DatabaseStats(**data)
@@ -135,7 +149,7 @@ class RemoteCollectorClient:
     def validate_data_compliance(self) -> Optional[Dict[str, Any]]:
         """Проверить соответствие данных ТЗ"""
         try:
-            response = requests.get(f"{self.server_url}/api/validation/compliance", timeout=30)
+            response = self.session.get(f"{self.server_url}/api/validation/compliance", timeout=30)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -147,31 +161,41 @@ class RemoteCollectorClient:
         print(f"🔄 Начинаем мониторинг в реальном времени ({duration_minutes} мин)")
         print("=" * 60)
         
-        end_time = time.time() + (duration_minutes * 60)
-        
         try:
-            async with websockets.connect(self.ws_url) as websocket:
-                while time.time() < end_time:
-                    try:
-                        # Получаем данные от WebSocket
-                        data = await asyncio.wait_for(websocket.recv(), timeout=10)
-                        monitoring_data = json.loads(data)
-                        
-                        # Выводим обновленную информацию
-                        self._display_monitoring_data(monitoring_data)
-                        
-                    except asyncio.TimeoutError:
-                        print("⚠️ Таймаут получения данных мониторинга")
-                    except websockets.exceptions.ConnectionClosed:
-                        print("❌ WebSocket соединение закрыто")
-                        break
-                    except Exception as e:
-                        print(f"❌ Ошибка мониторинга: {e}")
-                        await asyncio.sleep(5)
-                        
+            # Живость соединения проверяется ping/pong самой библиотеки websockets,
+            # а длительность мониторинга ограничивается одним внешним таймаутом
+            # вместо wait_for (отдельная Task + отмена) на каждый кадр
+            async with websockets.connect(
+                self.ws_url,
+                ping_interval=20,
+                ping_timeout=10
+            ) as websocket:
+                await asyncio.wait_for(
+                    self._consume_monitoring(websocket),
+                    timeout=duration_minutes * 60
+                )
+        except asyncio.TimeoutError:
+            pass  # Время мониторинга истекло
+        except websockets.exceptions.ConnectionClosed:
+            print("❌ WebSocket соединение закрыто")
         except Exception as e:
             print(f"❌ Ошибка подключения к WebSocket: {e}")
     
+    async def _consume_monitoring(self, websocket):
+        """Чтение кадров мониторинга до закрытия соединения"""
+        _loads = orjson.loads
+        async for data in websocket:
+            try:
+                monitoring_data = _loads(data)
+                
+                # Выводим обновленную информацию
+                self._display_monitoring_data(monitoring_data)
+                
+            except Exception as e:
+                print(f"❌ Ошибка мониторинга: {e}")
+                await asyncio.sleep(5)
+        print("❌ WebSocket соединение закрыто")
+    
     def _display_monitoring_data(self, data: Dict[str, Any]):
         """Отображение данных мониторинга"""
         timestamp = data.get('timestamp', datetime.now().isoformat())
@@ -179,50 +203,65 @@ class RemoteCollectorClient:
         database = data.get('database_stats', {})
         system = data.get('system_metrics', {})
         
-        # Очищаем экран и выводим заголовок
-        print("\033[2J\033[H")  # Clear screen
-        print(f"🔄 МОНИТОРИНГ КОЛЛЕКТОРА [{timestamp}]")
-        print("=" * 60)
+        # Кадр собирается целиком и выводится одним write() вместо ~20 print()
+        is_running = collector.get('is_running')
+        lines = [
+            "\033[2J\033[H",  # Clear screen
+            f"🔄 МОНИТОРИНГ КОЛЛЕКТОРА [{timestamp}]",
+            "=" * 60,
+        ]
         
         # Статус коллектора
-        status_icon = "🟢" if collector.get('is_running') else "🔴"
-        print(f"\n📊 КОЛЛЕКТОР: {status_icon}")
-        print(f"   Статус: {'Запущен' if collector.get('is_running') else 'Остановлен'}")
+        status_icon = "🟢" if is_running else "🔴"
+        lines.append(f"\n📊 КОЛЛЕКТОР: {status_icon}")
+        lines.append(f"   Статус: {'Запущен' if is_running else 'Остановлен'}")
         if collector.get('symbols'):
-            print(f"   Символы: {', '.join(collector['symbols'])}")
+            lines.append(f"   Символы: {', '.join(collector['symbols'])}")
         if collector.get('uptime_seconds'):
             uptime = timedelta(seconds=collector['uptime_seconds'])
-            print(f"   Время работы: {uptime}")
+            lines.append(f"   Время работы: {uptime}")
         if collector.get('error'):
-            print(f"   ⚠️ Ошибка: {collector['error']}")
+            lines.append(f"   ⚠️ Ошибка: {collector['error']}")
         
         # Статистика БД
-        print(f"\n🗄️ БАЗА ДАННЫХ:")
-        print(f"   Всего записей: {database.get('total_records', 0):,}")
-        print(f"   За последний час: {database.get('records_last_hour', 0):,}")
-        print(f"   За последний день: {database.get('records_last_day', 0):,}")
-        print(f"   Уникальных символов: {len(database.get('unique_symbols', []))}")
-        print(f"   Обновлений/мин: {database.get('avg_updates_per_minute', 0):.1f}")
+        lines.append("\n🗄️ БАЗА ДАННЫХ:")
+        lines.append(f"   Всего записей: {database.get('total_records', 0):,}")
+        lines.append(f"   За последний час: {database.get('records_last_hour', 0):,}")
+        lines.append(f"   За последний день: {database.get('records_last_day', 0):,}")
+        lines.append(f"   Уникальных символов: {len(database.get('unique_symbols', []))}")
+        lines.append(f"   Обновлений/мин: {database.get('avg_updates_per_minute', 0):.1f}")
         if database.get('last_update'):
-            print(f"   Последнее обновление: {database['last_update']}")
+            lines.append(f"   Последнее обновление: {database['last_update']}")
         
         # Системные метрики
-        print(f"\n⚡ СИСТЕМА:")
-        print(f"   CPU: {system.get('cpu_percent', 0):.1f}%")
-        print(f"   Память: {system.get('memory_percent', 0):.1f}%")
-        print(f"   Диск: {system.get('disk_percent', 0):.1f}%")
-        print(f"   Сетевые соединения: {system.get('network_connections', 0)}")
+        lines.append("\n⚡ СИСТЕМА:")
+        lines.append(f"   CPU: {system.get('cpu_percent', 0):.1f}%")
+        lines.append(f"   Память: {system.get('memory_percent', 0):.1f}%")
+        lines.append(f"   Диск: {system.get('disk_percent', 0):.1f}%")
+        lines.append(f"   Сетевые соединения: {system.get('network_connections', 0)}")
+        
+        lines.append("\n" + "=" * 60)
+        lines.append("Нажмите Ctrl+C для выхода\n")
         
-        print("\n" + "=" * 60)
-        print("Нажмите Ctrl+C для выхода")
+        sys.stdout.write("\n".join(lines))
+        sys.stdout.flush()
     
     def show_summary(self):
         """Показать сводную информацию"""
         print("📋 СВОДКА ПО КОЛЛЕКТОРУ")
         print("=" * 50)
         
+        # Три независимых HTTP запроса выполняем параллельно:
+        # время ожидания - максимум из RTT, а не их сумма
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            status_future = executor.submit(self.get_status)
+            db_stats_future = executor.submit(self.get_database_stats)
+            compliance_future = executor.submit(self.validate_data_compliance)
+        status = status_future.result()
+        db_stats = db_stats_future.result()
+        compliance = compliance_future.result()
+        
         # Статус коллектора
-        status = self.get_status()
         if status:
             status_icon = "🟢" if status.is_running else "🔴"
             print(f"\n{status_icon} Коллектор: {'Запущен' if status.is_running else 'Остановлен'}")
@@ -235,7 +274,6 @@ class RemoteCollectorClient:
             print("\n❌ Не удалось получить статус коллектора")
         
         # Статистика БД
-        db_stats = self.get_database_stats()
         if db_stats:
             print(f"\n🗄️ База данных:")
             print(f"   Всего записей: {db_stats.total_records:,}")
@@ -249,7 +287,6 @@ class RemoteCollectorClient:
             print("\n❌ Не удалось получить статистику БД")
         
         # Валидация ТЗ
-        compliance = self.validate_data_compliance()
         if compliance:
             print(f"\n✅ Валидация ТЗ:")
             validation_result = compliance.get('validation_result', {})
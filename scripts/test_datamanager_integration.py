@@ -93,7 +93,7 @@ async def test_datamanager_postgresql_integration():
     # 5. Принудительная запись буфера PostgreSQL
     if data_manager.postgres_manager:
         try:
-            await data_manager.postgres_manager._flush_batch()
+            await data_manager.postgres_manager.force_flush()
             print("  ✅ Batch буфер PostgreSQL сброшен")
         except Exception as e:
             print(f"  ⚠️ Ошибка сброса буфера: {e}")
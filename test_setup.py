@@ -5,96 +5,115 @@
 """
 
 import asyncio
+import io
 import logging
 import sys
 from pathlib import Path
 
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
 # Добавление пути к модулям
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from collector.config.settings import load_config, get_api_credentials
 
 
-async def test_api_keys():
+def _flush_output(out: io.StringIO) -> None:
+    """Вывод проверки одним write: проверки идут параллельно и не перемешиваются."""
+    sys.stdout.write(out.getvalue())
+    sys.stdout.flush()
+
+
+async def test_api_keys(config):
     """Тест загрузки API ключей."""
-    print("🔐 Тестирование загрузки API ключей...")
-    
-    # Загрузка конфигурации
-    config = load_config()
-    
-    # Проверка API ключей
-    api_creds = config.get('api_credentials', {})
-    
-    print(f"📋 Использование testnet: {config.get('api', {}).get('use_testnet', True)}")
-    print(f"🔗 WebSocket URL: {api_creds.get('ws_url', 'Не найден')}")
-    print(f"🏭 Режим: {'PRODUCTION' if not config.get('api', {}).get('use_testnet', True) else 'TESTNET'}")
-    
-    if api_creds.get('api_key'):
-        api_key = api_creds['api_key']
-        print(f"✅ API ключ загружен: {api_key[:8]}...{api_key[-4:]}")
-    else:
-        print("❌ API ключ не найден")
+    out = io.StringIO()
+    try:
+        print("🔐 Тестирование загрузки API ключей...", file=out)
+        
+        # Проверка API ключей
+        api_creds = config.get('api_credentials', {})
+        use_testnet = config.get('api', {}).get('use_testnet', True)
         
-    if api_creds.get('secret_key'):
-        secret = api_creds['secret_key']
-        print(f"✅ Secret ключ загружен: {secret[:8]}...{secret[-4:]}")
-    else:
-        print("❌ Secret ключ не найден")
+        print(f"📋 Использование testnet: {use_testnet}", file=out)
+        print(f"🔗 WebSocket URL: {api_creds.get('ws_url', 'Не найден')}", file=out)
+        print(f"🏭 Режим: {'PRODUCTION' if not use_testnet else 'TESTNET'}", file=out)
         
-    # Проверка Tardis API
-    tardis_key = config.get('tardis_api_key', '')
-    if tardis_key:
-        print(f"✅ Tardis API ключ: {tardis_key[:8]}...{tardis_key[-4:]}")
-    else:
-        print("❌ Tardis API ключ не найден")
+        if api_creds.get('api_key'):
+            api_key = api_creds['api_key']
+            print(f"✅ API ключ загружен: {api_key[:8]}...{api_key[-4:]}", file=out)
+        else:
+            print("❌ API ключ не найден", file=out)
+            
+        if api_creds.get('secret_key'):
+            secret = api_creds['secret_key']
+            print(f"✅ Secret ключ загружен: {secret[:8]}...{secret[-4:]}", file=out)
+        else:
+            print("❌ Secret ключ не найден", file=out)
+            
+        # Проверка Tardis API
+        tardis_key = config.get('tardis_api_key', '')
+        if tardis_key:
+            print(f"✅ Tardis API ключ: {tardis_key[:8]}...{tardis_key[-4:]}", file=out)
+        else:
+            print("❌ Tardis API ключ не найден", file=out)
+    finally:
+        _flush_output(out)
 
 
-async def test_websocket_connection():
+async def test_websocket_connection(config):
     """Тест WebSocket подключения."""
-    print("\n🌐 Тестирование WebSocket подключения...")
-    
+    out = io.StringIO()
     try:
-        # Попытка импорта websockets
-        import websockets
-        print("✅ Модуль websockets доступен")
+        print("\n🌐 Тестирование WebSocket подключения...", file=out)
         
-        # Загрузка конфигурации
-        config = load_config()
-        api_creds = config.get('api_credentials', {})
-        ws_url = api_creds.get('ws_url', 'wss://stream.binancefuture.com/ws/')
-        
-        # Тестовое подключение
-        test_url = f"{ws_url}btcusdt@depth"
-        print(f"🔗 Попытка подключения к: {test_url}")
+        if websockets is None:
+            print("❌ Модуль websockets не установлен", file=out)
+            print("💡 Установите: pip install websockets", file=out)
+            return
         
-        async with websockets.connect(test_url, ping_timeout=5) as websocket:
-            print("✅ WebSocket подключение успешно")
+        try:
+            print("✅ Модуль websockets доступен", file=out)
             
-            # Получение одного сообщения для проверки
-            message = await asyncio.wait_for(websocket.recv(), timeout=10)
-            print(f"📨 Получено тестовое сообщение ({len(message)} символов)")
+            api_creds = config.get('api_credentials', {})
+            ws_url = api_creds.get('ws_url', 'wss://stream.binancefuture.com/ws/')
             
-    except ImportError:
-        print("❌ Модуль websockets не установлен")
-        print("💡 Установите: pip install websockets")
-    except Exception as e:
-        print(f"❌ Ошибка WebSocket подключения: {e}")
+            # Тестовое подключение
+            test_url = f"{ws_url}btcusdt@depth"
+            print(f"🔗 Попытка подключения к: {test_url}", file=out)
+            
+            async with websockets.connect(test_url, ping_timeout=5) as websocket:
+                print("✅ WebSocket подключение успешно", file=out)
+                
+                # Получение одного сообщения для проверки
+                message = await asyncio.wait_for(websocket.recv(), timeout=10)
+                print(f"📨 Получено тестовое сообщение ({len(message)} символов)", file=out)
+                
+        except Exception as e:
+            print(f"❌ Ошибка WebSocket подключения: {e}", file=out)
+    finally:
+        _flush_output(out)
 
 
-async def test_data_directories():
+async def test_data_directories(config):
     """Тест создания директорий для данных."""
-    print("\n📁 Проверка директорий...")
-    
-    config = load_config()
-    base_dir = Path(config.get('storage', {}).get('base_dir', './data/binance_orderbook'))
-    logs_dir = Path('collector/logs')
-    
-    # Создание директорий
-    base_dir.mkdir(parents=True, exist_ok=True)
-    logs_dir.mkdir(parents=True, exist_ok=True)
-    
-    print(f"✅ Директория данных: {base_dir}")
-    print(f"✅ Директория логов: {logs_dir}")
+    out = io.StringIO()
+    try:
+        print("\n📁 Проверка директорий...", file=out)
+        
+        base_dir = Path(config.get('storage', {}).get('base_dir', './data/binance_orderbook'))
+        logs_dir = Path('collector/logs')
+        
+        # Создание директорий
+        base_dir.mkdir(parents=True, exist_ok=True)
+        logs_dir.mkdir(parents=True, exist_ok=True)
+        
+        print(f"✅ Директория данных: {base_dir}", file=out)
+        print(f"✅ Директория логов: {logs_dir}", file=out)
+    finally:
+        _flush_output(out)
 
 
 async def main():
@@ -103,9 +122,20 @@ async def main():
     print("=" * 60)
     
     try:
-        await test_api_keys()
-        await test_data_directories()
-        await test_websocket_connection()
+        # Конфигурация загружается один раз и передается всем проверкам
+        config = load_config()
+        
+        # Проверки независимы: WebSocket стартует первым, и пока идет его handshake,
+        # отрабатывают загрузка ключей и создание директорий
+        probes = {
+            'websocket': test_websocket_connection(config),
+            'api_keys': test_api_keys(config),
+            'directories': test_data_directories(config),
+        }
+        results = await asyncio.gather(*probes.values(), return_exceptions=True)
+        for name, result in zip(probes, results):
+            if isinstance(result, Exception):
+                print(f"❌ Ошибка проверки {name}: {result}")
         
         print("\n" + "=" * 60)
         print("✅ ВСЕ ТЕСТЫ ЗАВЕРШЕНЫ")
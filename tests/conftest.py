@@ -0,0 +1,12 @@
+"""
+Общая настройка pytest: пути импорта задаются один раз на сессию.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Корень репозитория (пакет collector) и scripts/ (клиент удаленного коллектора)
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
@@ -4,64 +4,72 @@
 
 import pytest
 import asyncio
-import json
-from unittest.mock import Mock, AsyncMock, patch
+import orjson
 from datetime import datetime
 
-# Импорты из нашей системы (после создания __init__.py файлов)
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
+# Импорты из нашей системы (пути импорта задает tests/conftest.py)
 from collector.processing.orderbook_processor import OrderBookProcessor
 from collector.storage.data_manager import DataManager
 from collector.config.settings import load_config
 
 
+# Неизменяемые входные данные тестов процессора (строятся один раз при импорте)
+VALID_DATA = {
+    'e': 'depthUpdate',
+    'E': 1699999999999,
+    's': 'BTCUSDT',
+    'b': [['43250.50', '0.75']],
+    'a': [['43251.00', '1.25']]
+}
+
+INVALID_DATA = {
+    'e': 'wrongType',
+    'E': 1699999999999,
+    's': 'BTCUSDT'
+}
+
+BEST_PRICES_INPUT = {
+    'b': [['43250.50', '0.75'], ['43250.00', '1.00']],
+    'a': [['43251.00', '1.25'], ['43251.50', '0.50']]
+}
+
+
+class _StubDataManager:
+    """Минимальная замена DataManager: только запоминает сохраненные записи."""
+    
+    __slots__ = ('calls',)
+    
+    def __init__(self):
+        self.calls = []
+        
+    async def save_record(self, record):
+        self.calls.append(record)
+
+
 class TestOrderBookProcessor:
     """Тесты для обработчика orderbook данных."""
     
-    def setup_method(self):
-        """Настройка для каждого теста."""
-        self.mock_data_manager = Mock()
-        self.mock_data_manager.save_record = AsyncMock()
-        self.processor = OrderBookProcessor(self.mock_data_manager)
+    @pytest.fixture
+    def processor(self):
+        """Свежий процессор с заглушкой менеджера данных."""
+        return OrderBookProcessor(_StubDataManager())
         
-    def test_validate_data_valid(self):
+    def test_validate_data_valid(self, processor):
         """Тест валидации корректных данных."""
-        valid_data = {
-            'e': 'depthUpdate',
-            'E': 1699999999999,
-            's': 'BTCUSDT',
-            'b': [['43250.50', '0.75']],
-            'a': [['43251.00', '1.25']]
-        }
+        assert processor._validate_data(VALID_DATA) is True
         
-        assert self.processor._validate_data(valid_data) is True
-        
-    def test_validate_data_invalid(self):
+    def test_validate_data_invalid(self, processor):
         """Тест валидации некорректных данных."""
-        invalid_data = {
-            'e': 'wrongType',
-            'E': 1699999999999,
-            's': 'BTCUSDT'
-        }
+        assert processor._validate_data(INVALID_DATA) is False
         
-        assert self.processor._validate_data(invalid_data) is False
-        
-    def test_extract_best_prices(self):
+    def test_extract_best_prices(self, processor):
         """Тест извлечения лучших цен."""
-        data = {
-            'b': [['43250.50', '0.75'], ['43250.00', '1.00']],
-            'a': [['43251.00', '1.25'], ['43251.50', '0.50']]
-        }
-        
-        best_bid, best_ask = self.processor._extract_best_prices(data)
+        best_bid, best_ask = processor._extract_best_prices(BEST_PRICES_INPUT)
         
         assert best_bid == [43250.50, 0.75]
         assert best_ask == [43251.00, 1.25]
         
-    def test_create_record(self):
+    def test_create_record(self, processor):
         """Тест создания записи."""
         data = {
             's': 'BTCUSDT',
@@ -72,7 +80,7 @@ class TestOrderBookProcessor:
         best_bid = [43250.50, 0.75]
         best_ask = [43251.00, 1.25]
         
-        record = self.processor._create_record(data, best_bid, best_ask)
+        record = processor._create_record(data, best_bid, best_ask)
         
         expected = {
             'exchange': 'binance-futures',
@@ -88,7 +96,7 @@ class TestOrderBookProcessor:
         assert record == expected
         
     @pytest.mark.asyncio
-    async def test_process_orderbook_update(self):
+    async def test_process_orderbook_update(self, processor):
         """Тест полной обработки обновления orderbook."""
         data = {
             'e': 'depthUpdate',
@@ -99,13 +107,13 @@ class TestOrderBookProcessor:
             'local_timestamp': 1699999999000000
         }
         
-        await self.processor.process_orderbook_update(data)
+        await processor.process_orderbook_update(data)
         
         # Проверяем, что метод сохранения был вызван
-        self.mock_data_manager.save_record.assert_called_once()
+        assert len(processor.data_manager.calls) == 1
         
         # Проверяем статистику
-        stats = self.processor.get_stats()
+        stats = processor.get_stats()
         assert stats['processed_count'] == 1
         assert stats['error_count'] == 0
 
@@ -113,28 +121,22 @@ class TestOrderBookProcessor:
 class TestDataManager:
     """Тесты для менеджера данных."""
     
-    def setup_method(self):
-        """Настройка для каждого теста."""
-        self.test_dir = "/tmp/test_data_collector"
-        self.config = {
+    @pytest.fixture
+    def data_manager(self, tmp_path):
+        """Менеджер данных в отдельной временной директории (очистку делает pytest)."""
+        config = {
             'storage': {
                 'rotation_hours': 1
             }
         }
-        self.data_manager = DataManager(
-            output_dir=self.test_dir,
+        return DataManager(
+            output_dir=str(tmp_path),
             compress=False,  # Без сжатия для простоты тестов
-            config=self.config
+            config=config
         )
-        
-    def teardown_method(self):
-        """Очистка после теста."""
-        import shutil
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
             
     @pytest.mark.asyncio
-    async def test_save_record(self):
+    async def test_save_record(self, data_manager):
         """Тест сохранения записи."""
         record = {
             'exchange': 'binance-futures',
@@ -147,15 +149,15 @@ class TestDataManager:
             'bid_amount': 0.75
         }
         
-        await self.data_manager.save_record(record)
+        await data_manager.save_record(record)
         
         # Проверяем статистику
-        stats = self.data_manager.get_stats()
+        stats = data_manager.get_stats()
         assert stats['files_created'] >= 1
         
-    def test_get_stats(self):
+    def test_get_stats(self, data_manager):
         """Тест получения статистики."""
-        stats = self.data_manager.get_stats()
+        stats = data_manager.get_stats()
         
         expected_keys = [
             'records_written', 'files_created', 'buffer_size',
@@ -186,7 +188,7 @@ class TestConfig:
             "custom_setting": "test_value"
         }
         
-        config_file.write_text(json.dumps(test_config))
+        config_file.write_bytes(orjson.dumps(test_config))
         
         config = load_config(str(config_file))
         
@@ -200,11 +202,10 @@ class TestIntegration:
     """Интеграционные тесты."""
     
     @pytest.mark.asyncio
-    async def test_full_pipeline_simulation(self):
+    async def test_full_pipeline_simulation(self, tmp_path):
         """Тест полного pipeline обработки данных."""
         # Создание компонентов
-        test_dir = "/tmp/test_integration"
-        data_manager = DataManager(output_dir=test_dir, compress=False)
+        data_manager = DataManager(output_dir=str(tmp_path), compress=False)
         processor = OrderBookProcessor(data_manager)
         
         try:
@@ -233,11 +234,8 @@ class TestIntegration:
             assert manager_stats['files_created'] >= 1
             
         finally:
-            # Очистка
+            # Очистка директории - на стороне pytest (tmp_path)
             await data_manager.shutdown()
-            import shutil
-            if os.path.exists(test_dir):
-                shutil.rmtree(test_dir)
 
 
 if __name__ == "__main__":